@@ -0,0 +1,48 @@
+"""Представления объектов в JSON.
+
+Каждая функция читает только поля, которые уже загружены запросами
+представлений (Post.objects.for_listing() и т.п.), поэтому сериализация
+не делает дополнительных запросов.
+"""
+
+
+def post_data(post) -> dict:
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'updated': post.updated.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'image_width': post.image_width,
+        'comments_count': post.comments_count,
+    }
+
+
+def comment_data(comment) -> dict:
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def group_data(group) -> dict:
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+        'posts_count': group.posts_count,
+    }
+
+
+def profile_data(user, stats) -> dict:
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
@@ -0,0 +1,184 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.views import POSTS_PER_PAGE
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='tests', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group
+            )
+            for i in range(POSTS_PER_PAGE + 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    def test_posts_cursor_pagination(self):
+        response = self.get('posts')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+        self.assertEqual(data['results'][0]['id'], self.posts[-1].pk)
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[1].pk, self.posts[0].pk]
+        )
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_sparse_fields(self):
+        data = self.get('posts', fields='id,author').json()
+        self.assertEqual(
+            data['results'][0], {'id': self.posts[-1].pk, 'author': 'author'}
+        )
+        # Выбор полей сохраняется в ссылке на следующую страницу
+        self.assertIn('fields=id%2Cauthor', data['next'])
+        response = self.get('posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_fetch_keeps_requested_order(self):
+        ids = [self.posts[3].pk, 999999, self.posts[0].pk]
+        with self.assertNumQueries(1):
+            data = self.get('posts', ids=','.join(map(str, ids))).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[3].pk, self.posts[0].pk]
+        )
+        self.assertEqual(self.get('posts', ids='1,x').status_code, 400)
+
+    def test_batch_fetch_rejects_empty_ids(self):
+        for ids in ('', ','):
+            with self.subTest(ids=ids):
+                response = self.get('posts', ids=ids)
+                self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api:post', args=[self.posts[0].pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments_count'], 1)
+
+    def test_group_profile_and_comments(self):
+        self.assertEqual(
+            self.get('group', self.group.slug).json()['posts_count'],
+            len(self.posts)
+        )
+        self.assertEqual(
+            self.get('groups', fields='slug').json(),
+            {'results': [{'slug': 'tests'}]}
+        )
+        self.assertEqual(
+            len(self.get('group_posts', self.group.slug).json()['results']),
+            POSTS_PER_PAGE
+        )
+        profile = self.get('profile', 'author').json()
+        self.assertEqual(profile['full_name'], 'Лев Толстой')
+        self.assertEqual(profile['posts_count'], len(self.posts))
+        self.assertEqual(
+            len(self.get('profile_posts', 'author').json()['results']),
+            POSTS_PER_PAGE
+        )
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        comments = self.get('post_comments', self.posts[0].pk).json()
+        self.assertEqual(
+            [comment['author'] for comment in comments['results']],
+            ['reader']
+        )
+
+    def test_lists_see_new_comments(self):
+        """Комментарий сбрасывает кэш всех списков с этим постом."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        post = self.posts[-1]
+        lists = (
+            ('posts',),
+            ('group_posts', self.group.slug),
+            ('profile_posts', 'author'),
+            ('feed',),
+        )
+
+        def counts():
+            return [
+                self.get(*args).json()['results'][0]['comments_count']
+                for args in lists
+            ]
+
+        self.assertEqual(counts(), [0, 0, 0, 0])
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        self.assertEqual(counts(), [1, 1, 1, 1])
+        comment.delete()
+        self.assertEqual(counts(), [0, 0, 0, 0])
+
+    def test_errors_are_json(self):
+        response = self.get('post', 999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+        self.assertEqual(self.get('posts', cursor='garbage').status_code, 400)
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_feed_requires_login_and_is_per_user(self):
+        self.assertEqual(self.get('feed').status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            len(self.get('feed').json()['results']), POSTS_PER_PAGE
+        )
+        self.client.force_login(self.author)
+        self.assertEqual(self.get('feed').json()['results'], [])
+
+    def test_feed_pages_through_timeline(self):
+        """Лента API, как и HTML-лента, листается по записям ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('feed').json()
+        entries, posts = [
+            query['sql'] for query in queries
+            if 'posts_timelineentry' in query['sql']
+            or 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertIn('FROM "posts_timelineentry"', entries)
+        self.assertNotIn('posts_timelineentry', posts)
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [post.pk for post in self.posts[::-1][:POSTS_PER_PAGE]],
+        )
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [post.pk for post in self.posts[1::-1]],
+        )
@@ -0,0 +1,258 @@
+"""JSON API только для чтения.
+
+Запросы те же, что у HTML-страниц posts.views, ответы кэшируются по
+поколениям областей данных и отдают ETag для условного GET.
+"""
+from functools import wraps
+
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+
+from api import serializers
+from posts import generations, timelines
+from posts.counters import group_posts_count, user_stats
+from posts.decorators import generation_response
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPaginator
+from posts.views import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+# Сколько постов можно запросить за раз через ?ids=
+MAX_BATCH = 100
+
+
+class ApiError(Exception):
+    def __init__(self, detail: str, status: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def error_response(detail: str, status: int) -> JsonResponse:
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _json_response(view, request, kwargs) -> JsonResponse:
+    try:
+        return JsonResponse(
+            view(request, **kwargs),
+            json_dumps_params={'ensure_ascii': False},
+        )
+    except ApiError as error:
+        return error_response(error.detail, error.status)
+    except Http404:
+        return error_response('Не найдено', 404)
+
+
+def api_view(get_scopes, per_user=False):
+    """GET-представление API с кэшем и ETag по поколению областей.
+
+    get_scopes(request, **kwargs) возвращает области, от которых зависит
+    ответ. Ответ с per_user=True зависит от пользователя, поэтому ключ его
+    кэша включает id пользователя; остальные ответы общие для всех.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = error_response('Метод не поддерживается', 405)
+                response['Allow'] = 'GET, HEAD'
+                return response
+
+            try:
+                scopes = get_scopes(request, **kwargs)
+            except ApiError as error:
+                return error_response(error.detail, error.status)
+            response = generation_response(
+                request,
+                scopes,
+                lambda: _json_response(view, request, kwargs),
+                f'api:{request.user.pk}' if per_user else 'api',
+            )
+            if per_user:
+                patch_vary_headers(response, ('Cookie',))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def select_fields(request, data: dict) -> dict:
+    """Оставляет только поля из ?fields=, если он передан."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return data
+    fields = fields.split(',')
+    unknown = set(fields) - set(data)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return {field: data[field] for field in fields}
+
+
+def page_data(request, queryset, serialize, per_page, date_field='pub_date',
+              key_field='pk', load=list):
+    """Страница курсорной пагинации со ссылками на соседние страницы.
+
+    load(page) возвращает объекты страницы для serialize.
+    """
+    paginator = CursorPaginator(
+        queryset, per_page, date_field=date_field, key_field=key_field
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidPage:
+        raise ApiError('Некорректный курсор')
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        return request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}'
+        )
+
+    return {
+        'results': [
+            select_fields(request, serialize(obj)) for obj in load(page)
+        ],
+        'next': link(page.next_cursor),
+        'previous': link(page.previous_cursor),
+    }
+
+
+def parse_ids(request):
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise ApiError('ids — список чисел через запятую')
+    if not ids:
+        raise ApiError('Пустой список ids')
+    if len(ids) > MAX_BATCH:
+        raise ApiError(f'Не больше {MAX_BATCH} ids за запрос')
+    return ids
+
+
+def posts_scopes(request):
+    if 'ids' in request.GET:
+        return [generations.post_scope(pk) for pk in parse_ids(request)]
+    return [generations.INDEX, generations.COMMENTS]
+
+
+@api_view(posts_scopes)
+def posts(request):
+    if 'ids' in request.GET:
+        # Пакетная выборка: посты в порядке запроса, отсутствующие пропущены
+        ids = parse_ids(request)
+        found = Post.objects.for_listing().in_bulk(ids)
+        return {
+            'results': [
+                select_fields(request, serializers.post_data(found[pk]))
+                for pk in ids if pk in found
+            ],
+        }
+    return page_data(
+        request,
+        Post.objects.for_listing(),
+        serializers.post_data,
+        POSTS_PER_PAGE,
+    )
+
+
+@api_view(lambda request, post_id: [generations.post_scope(post_id)])
+def post(request, post_id):
+    return select_fields(
+        request,
+        serializers.post_data(
+            get_object_or_404(Post.objects.for_listing(), pk=post_id)
+        ),
+    )
+
+
+@api_view(lambda request, post_id: [generations.post_scope(post_id)])
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return page_data(
+        request,
+        Comment.objects.filter(post=post_id).select_related('author').only(
+            'id', 'text', 'created', 'author__username'
+        ),
+        serializers.comment_data,
+        COMMENTS_PER_PAGE,
+        date_field='created',
+    )
+
+
+@api_view(lambda request: [generations.GROUPS, generations.INDEX])
+def groups(request):
+    results = []
+    for group in Group.objects.order_by('title'):
+        group_posts_count(group)
+        results.append(
+            select_fields(request, serializers.group_data(group))
+        )
+    return {'results': results}
+
+
+@api_view(lambda request, slug: [generations.group_scope(slug)])
+def group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    group_posts_count(group)
+    return select_fields(request, serializers.group_data(group))
+
+
+@api_view(lambda request, slug: [
+    generations.group_scope(slug), generations.COMMENTS
+])
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return page_data(
+        request,
+        Post.objects.for_listing().filter(group=group),
+        serializers.post_data,
+        POSTS_PER_PAGE,
+    )
+
+
+@api_view(lambda request, username: [generations.author_scope(username)])
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    return select_fields(
+        request, serializers.profile_data(author, user_stats(author))
+    )
+
+
+@api_view(lambda request, username: [
+    generations.author_scope(username), generations.COMMENTS
+])
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return page_data(
+        request,
+        Post.objects.for_listing().filter(author=author),
+        serializers.post_data,
+        POSTS_PER_PAGE,
+    )
+
+
+def feed_scopes(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация', 401)
+    return [generations.feed_scope(request.user.pk), generations.COMMENTS]
+
+
+@api_view(feed_scopes, per_user=True)
+def feed(request):
+    # Как и HTML-лента: диапазон индекса записей, посты одним запросом
+    return page_data(
+        request,
+        timelines.entries(request.user.pk),
+        serializers.post_data,
+        POSTS_PER_PAGE,
+        key_field='post_id',
+        load=timelines.posts_of,
+    )
@@ -0,0 +1,36 @@
+"""SQLite, в котором транзакции сразу берут блокировку записи.
+
+Обычный BEGIN откладывает блокировку до первой записи. Транзакция,
+которая сначала читает, а потом пишет, в режиме WAL получает «database
+is locked» сразу, без ожидания busy_timeout, если за это время записал
+кто-то другой. BEGIN IMMEDIATE ждёт блокировку в начале транзакции,
+пока ещё нечего откатывать.
+
+Транзакции только для чтения (snapshot) начинаются обычным BEGIN: им
+нужен согласованный снимок базы, а не блокировка записи.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    deferred_begin = False
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(
+            'BEGIN' if self.deferred_begin else 'BEGIN IMMEDIATE'
+        )
+
+    @contextmanager
+    def snapshot(self):
+        """Транзакция только для чтения: все запросы видят одно состояние
+        базы, а в режиме WAL писатели её не ждут."""
+        self.deferred_begin = True
+        try:
+            with transaction.atomic(using=self.alias):
+                self.deferred_begin = False
+                yield
+        finally:
+            self.deferred_begin = False
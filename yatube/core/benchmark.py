@@ -0,0 +1,261 @@
+"""Замеры представлений в процессе, без сетевого сервера.
+
+Каждый сценарий — запрос к одному представлению с данными, случайно
+выбранными из базы. Для него считаются перцентили задержки, число
+SQL-запросов и пик выделенной памяти. Списки листаются курсорами, как
+в ссылках сайта. Сценарии записи идут через write_view, как на рабочем
+сервере, без внешней транзакции; созданное ими удаляется в конце
+прогона.
+"""
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from posts.paginators import NEXT, encode_cursor
+
+# Пик памяти меряется отдельным коротким прогоном: tracemalloc
+# замедляет код в разы и исказил бы задержки
+MEMORY_SAMPLES = 5
+# Доля запросов к первой странице списка, остальные — по курсору
+FIRST_PAGE_SHARE = 0.2
+
+# Записи, после которых начинаются страницы по курсору
+PostRow = namedtuple('PostRow', 'pk pub_date group author')
+EntryRow = namedtuple('EntryRow', 'post_id pub_date')
+
+
+def percentile(values, percent: float) -> float:
+    """Перцентиль с линейной интерполяцией.
+
+    То же, что statistics.quantiles(method='inclusive'), которого нет в
+    Python 3.7.
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Sample:
+    """Случайные объекты базы, к которым обращаются сценарии."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.posts = [
+            PostRow(*row) for row in Post.objects.values_list(
+                'pk', 'pub_date', 'group__slug', 'author__username'
+            )
+        ]
+        self.post_ids = [post.pk for post in self.posts]
+        self.group_posts = defaultdict(list)
+        self.author_posts = defaultdict(list)
+        for post in self.posts:
+            if post.group:
+                self.group_posts[post.group].append(post)
+            self.author_posts[post.author].append(post)
+        self.group_slugs = list(self.group_posts)
+        self.authors = list(self.author_posts)
+        if not self.post_ids:
+            raise ValueError(
+                'В базе нет постов, сначала выполните generate_dataset'
+            )
+        # Читатель с самой длинной лентой — худший случай для follow_index
+        reader_id = Follow.objects.values('user').annotate(
+            follows=Count('pk')
+        ).order_by('-follows').values_list('user', flat=True).first()
+        self.reader = User.objects.get(
+            pk=reader_id
+        ) if reader_id else User.objects.first()
+        self.own_texts = dict(self.reader.posts.values_list('pk', 'text'))
+        self.own_post_ids = list(self.own_texts) or [
+            Post.objects.create(author=self.reader, text='Замер').pk
+        ]
+        self.entries = [
+            EntryRow(*row) for row in TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post_id', 'pub_date')
+        ]
+
+    def post_id(self):
+        return self.rng.choice(self.post_ids)
+
+    def own_post_id(self):
+        return self.rng.choice(self.own_post_ids)
+
+    def group_slug(self):
+        return self.rng.choice(self.group_slugs)
+
+    def author(self):
+        return self.rng.choice(self.authors)
+
+    def cursor(self, rows, key_field='pk') -> dict:
+        """Параметры страницы, начинающейся после случайной записи rows."""
+        if not rows or self.rng.random() < FIRST_PAGE_SHARE:
+            return {}
+        row = self.rng.choice(rows)
+        return {'cursor': encode_cursor(row, NEXT, key_field=key_field)}
+
+
+def _group_list(sample):
+    slug = sample.group_slug()
+    return (
+        'get', reverse('posts:group_list', args=[slug]),
+        sample.cursor(sample.group_posts[slug]),
+    )
+
+
+def _profile(sample):
+    author = sample.author()
+    return (
+        'get', reverse('posts:profile', args=[author]),
+        sample.cursor(sample.author_posts[author]),
+    )
+
+
+Scenario = namedtuple('Scenario', 'name guest make_request')
+
+# make_request(sample) возвращает метод, URL и данные запроса
+SCENARIOS = (
+    Scenario('index', False, lambda s: (
+        'get', reverse('posts:index'), s.cursor(s.posts)
+    )),
+    Scenario('index (гость)', True, lambda s: (
+        'get', reverse('posts:index'), s.cursor(s.posts)
+    )),
+    Scenario('group_list', False, _group_list),
+    Scenario('profile', False, _profile),
+    Scenario('post_detail', False, lambda s: (
+        'get', reverse('posts:post_detail', args=[s.post_id()]), {}
+    )),
+    Scenario('follow_index', False, lambda s: (
+        'get', reverse('posts:follow_index'),
+        s.cursor(s.entries, key_field='post_id'),
+    )),
+    Scenario('post_create', False, lambda s: (
+        'post', reverse('posts:post_create'), {'text': 'Замер'}
+    )),
+    Scenario('post_edit', False, lambda s: (
+        'post', reverse('posts:post_edit', args=[s.own_post_id()]),
+        {'text': 'Замер'}
+    )),
+    Scenario('add_comment', False, lambda s: (
+        'post', reverse('posts:add_comment', args=[s.post_id()]),
+        {'text': 'Замер'}
+    )),
+    Scenario('profile_follow', False, lambda s: (
+        'get', reverse('posts:profile_follow', args=[s.author()]), {}
+    )),
+)
+
+
+def _request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: ответ {response.status_code}')
+
+
+def _measure(client, make_request, sample, requests):
+    latencies, queries = [], []
+    for _ in range(requests):
+        method, url, data = make_request(sample)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            _request(client, method, url, data)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+
+    peaks = []
+    for _ in range(MEMORY_SAMPLES):
+        method, url, data = make_request(sample)
+        tracemalloc.start()
+        try:
+            _request(client, method, url, data)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'queries_mean': statistics.mean(queries),
+        'queries_max': max(queries),
+        'memory_peak_kib': statistics.median(peaks) / 1024,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Модели, строки которых создают сценарии записи, в порядке удаления
+CREATED_BY_SCENARIOS = (Follow, Comment, Post)
+
+
+def _clean_up(last_pks, sample):
+    """Удаляет созданное сценариями и возвращает тексты своих постов.
+
+    Через модели, а не SQL: сигналы поправляют счётчики, ленты и кэш.
+    """
+    for model in CREATED_BY_SCENARIOS:
+        model.objects.filter(pk__gt=last_pks[model]).delete()
+    for post in Post.objects.filter(pk__in=sample.own_texts):
+        if post.text != sample.own_texts[post.pk]:
+            post.text = sample.own_texts[post.pk]
+            post.save()
+
+
+def run(requests=100, warmup=10, scenarios=None, seed=0, report=None):
+    """Прогоняет сценарии и возвращает результаты замеров по именам."""
+    rng = random.Random(seed)
+    results = {}
+    last_pks = {
+        model: model.objects.aggregate(last=Max('pk'))['last'] or 0
+        for model in CREATED_BY_SCENARIOS
+    }
+    sample = None
+    # Панель отладки встраивается в каждый ответ при DEBUG
+    with override_settings(DEBUG=False):
+        try:
+            sample = Sample(rng)
+            reader, guest = Client(), Client()
+            reader.force_login(sample.reader)
+            for scenario in SCENARIOS:
+                if scenarios and scenario.name not in scenarios:
+                    continue
+                client = guest if scenario.guest else reader
+                for _ in range(warmup):
+                    _request(client, *scenario.make_request(sample))
+                result = _measure(
+                    client, scenario.make_request, sample, requests
+                )
+                results[scenario.name] = result
+                if report:
+                    report(scenario.name, result)
+        finally:
+            if sample is not None:
+                _clean_up(last_pks, sample)
+    return results
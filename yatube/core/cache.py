@@ -0,0 +1,252 @@
+import os
+import pickle
+import sqlite3
+import itertools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics
+from core.performance import record_cache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+
+# Ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 500
+
+# Время последнего чтения обновляется не чаще раза в секунду, иначе
+# каждый get превращался бы в запись
+ACCESS_RESOLUTION = 1.0
+
+
+# Счётчики записей по файлам кэша, общие для всех экземпляров процесса:
+# Django создаёт экземпляр кэша на каждый поток, а сервер с потоком на
+# запрос иначе начинал бы счёт заново и ни разу не дошёл бы до проверки
+_writes = defaultdict(itertools.count)
+_writes_lock = threading.Lock()
+
+
+def _chunks(keys):
+    for start in range(0, len(keys), CHUNK_SIZE):
+        yield keys[start:start + CHUNK_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов сервера на хосте.
+
+    Файл работает в режиме WAL: читатели не блокируют писателя. Записи
+    с истёкшим TIMEOUT не отдаются, при превышении MAX_ENTRIES удаляются
+    давно не читавшиеся (LRU) записи. Число записей проверяется не на
+    каждой записи, а на каждой CULL_EVERY-й (по умолчанию 50): между
+    проверками кэш может ненадолго превысить MAX_ENTRIES.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        options = params.get('OPTIONS', {})
+        self._cull_every = int(options.get('CULL_EVERY', 50))
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        """Транзакция, сразу берущая блокировку на запись."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def _alive(expires, now) -> bool:
+        return expires is None or expires > now
+
+    def _prepare(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _touch_accessed(self, keys, now):
+        self._connection.execute(
+            'UPDATE cache SET accessed = ? WHERE accessed < ? AND key IN '
+            f'({",".join("?" * len(keys))})',
+            (now, now - ACCESS_RESOLUTION, *keys),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self._prepare(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        started = time.perf_counter()
+        now = time.time()
+        rows = []
+        for chunk in _chunks(keys):
+            rows += self._connection.execute(
+                'SELECT key, value, expires FROM cache WHERE key IN '
+                f'({",".join("?" * len(chunk))})',
+                chunk,
+            ).fetchall()
+        found = {
+            key: pickle.loads(value)
+            for key, value, expires in rows if self._alive(expires, now)
+        }
+        for chunk in _chunks(list(found)):
+            self._touch_accessed(chunk, now)
+        record_cache(
+            len(found), len(keys) - len(found), time.perf_counter() - started
+        )
+        metrics.record_cache(keys, found)
+        return found
+
+    def get_many(self, keys, version=None):
+        prepared = {self._prepare(key, version): key for key in keys}
+        return {
+            prepared[key]: value
+            for key, value in self._get_many(list(prepared)).items()
+        }
+
+    def _set(self, connection, key, value, timeout, now):
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                key,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+                now,
+            ),
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as connection:
+            for key, value in data.items():
+                key = self._prepare(key, version)
+                self._set(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            self._set(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._prepare(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare(key, version)
+        now = time.time()
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, now),
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._prepare(key, version)
+        row = self._connection.execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._prepare(key, version) for key in keys]
+        for chunk in _chunks(keys):
+            self._connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                f'({",".join("?" * len(chunk))})',
+                chunk,
+            )
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок процесса, как и у LocMemCache
+        pass
+
+    def _cull(self, connection, now):
+        # COUNT(*) проходит всю таблицу, на каждой записи он слишком дорог
+        with _writes_lock:
+            writes = next(_writes[self._path]) + 1
+        if writes % self._cull_every:
+            return
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?'
+            ')',
+            (max(count // self._cull_frequency, count - self._max_entries),),
+        )
@@ -0,0 +1,84 @@
+"""Чтение с реплик базы, запись в основную базу.
+
+ReplicaMiddleware выбирает для запроса к сайту одну из реплик
+DATABASE_REPLICAS, и ReplicaRouter отправляет на неё чтения. Основная
+база ('default') читается:
+- вне запросов к сайту: в командах, фоновых потоках, тестах;
+- в запросах, меняющих данные (POST и т.п.);
+- после первой записи в запросе;
+- ещё REPLICA_STICKY_SECONDS секунд после записи в той же сессии
+  браузера, пока реплики могут не успеть получить изменения.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Метка «недавно писал», пока она есть, чтения идут в основную базу
+STICKY_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('replica_state', default=None)
+
+
+class _State:
+    def __init__(self, replica, pinned: bool):
+        self.replica = replica
+        self.pinned = pinned
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Дальше запрос должен видеть свою запись
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы, схема приходит вместе с данными
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        state = _State(
+            random.choice(replicas) if replicas else None,
+            pinned=(
+                request.method not in SAFE_METHODS
+                or STICKY_COOKIE in request.COOKIES
+            ),
+        )
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
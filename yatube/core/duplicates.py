@@ -0,0 +1,164 @@
+"""Поиск N+1 и повторяющихся SQL-запросов.
+
+DuplicateQueriesMiddleware группирует запросы, выполненные за время
+обработки запроса к сайту, по форме: SQL без значений параметров. Форма,
+повторившаяся DUPLICATE_QUERIES_THRESHOLD раз, — признак N+1; один и тот
+же запрос с теми же параметрами дважды — лишний запрос. Для каждого
+повтора указываются место в коде проекта и строка шаблона, откуда он
+выполнен.
+
+DUPLICATE_QUERIES задаёт реакцию: 'warn' пишет отчёт в журнал, 'raise'
+бросает DuplicateQueries (так настроены тесты), None выключает поиск.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# Управление транзакциями повторяется законно
+_TRANSACTION = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+_allowed = ContextVar('duplicate_queries_allowed', default=False)
+
+
+class DuplicateQueries(AssertionError):
+    pass
+
+
+@contextmanager
+def allow_duplicates():
+    """Запросы внутри блока повторяются осознанно и не проверяются."""
+    token = _allowed.set(True)
+    try:
+        yield
+    finally:
+        _allowed.reset(token)
+
+
+def shape(sql: str) -> str:
+    """SQL без значений: запросы одной формы различаются только ими."""
+    return _LITERALS.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+def _template_line(frame):
+    # Узел шаблона, который сейчас отрисовывается
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def _code_line(frame):
+    # Ближайшая к запросу строка кода проекта, не библиотек
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (
+            filename.startswith(settings.BASE_DIR)
+            and 'site-packages' not in filename
+        ):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return None
+
+
+def location(frame) -> str:
+    # Остальные обёртки execute_wrapper — не место запроса
+    caller = frame
+    while caller is not None:
+        if caller.f_code.co_name == '_execute_with_wrappers':
+            frame = caller.f_back
+            break
+        caller = caller.f_back
+    return ', '.join(
+        line for line in (_code_line(frame), _template_line(frame)) if line
+    ) or 'неизвестно'
+
+
+class Detector:
+    """Обёртка execute_wrapper, запоминающая формы и места запросов."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.shapes = defaultdict(Counter)
+        self.exact = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not (
+            _allowed.get()
+            or sql.lstrip().upper().startswith(_TRANSACTION)
+        ):
+            self.shapes[shape(sql)][location(sys._getframe(1))] += 1
+            self.exact[sql, repr(params)] += 1
+        return execute(sql, params, many, context)
+
+    def problems(self) -> list:
+        """Повторы в виде (описание, форма, места с числом запросов)."""
+        problems = []
+        duplicated = Counter()
+        for (sql, _), count in self.exact.items():
+            if count > 1:
+                duplicated[shape(sql)] += count
+        for query, locations in self.shapes.items():
+            count = sum(locations.values())
+            if count >= self.threshold:
+                problems.append(
+                    (f'{count} запросов одной формы', query, locations)
+                )
+            elif duplicated[query]:
+                problems.append((
+                    f'{duplicated[query]} одинаковых запросов',
+                    query,
+                    locations,
+                ))
+        return problems
+
+    def report(self) -> str:
+        lines = []
+        for title, query, locations in self.problems():
+            lines.append(f'{title}: {query}')
+            lines.extend(
+                f'    {count} × {place}'
+                for place, count in locations.most_common()
+            )
+        return '\n'.join(lines)
+
+
+class DuplicateQueriesMiddleware:
+    def __init__(self, get_response):
+        if not settings.DUPLICATE_QUERIES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = Detector(settings.DUPLICATE_QUERIES_THRESHOLD)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(detector))
+            response = self.get_response(request)
+
+        report = detector.report()
+        if report:
+            message = f'{request.method} {request.path}:\n{report}'
+            if settings.DUPLICATE_QUERIES == 'raise':
+                raise DuplicateQueries(message)
+            logger.warning(message)
+        return response
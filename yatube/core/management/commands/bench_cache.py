@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+PAGE = 'x' * 2000
+
+
+def run_operations(cache, ops):
+    """Смесь операций, похожая на работу лент: чтения чаще записей."""
+    timings = {}
+    keys = [f'card:{i}' for i in range(ops)]
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, PAGE)
+    timings['set'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    timings['get'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, ops, 10):
+        cache.get_many(keys[i:i + 10])
+    timings['get_many(10)'] = time.perf_counter() - start
+
+    cache.set('counter', 0)
+    start = time.perf_counter()
+    for _ in range(ops):
+        cache.incr('counter')
+    timings['incr'] = time.perf_counter() - start
+
+    return timings
+
+
+def worker(path, ops, options, queue):
+    queue.put(run_operations(SQLiteCache(path, {'OPTIONS': options}), ops))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает производительность SQLiteCache и LocMemCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000)
+        parser.add_argument('--processes', type=int, default=4)
+
+    def report(self, name, timings, ops):
+        self.stdout.write(name)
+        for operation, seconds in timings.items():
+            self.stdout.write(
+                f'  {operation:<14}{ops / seconds:>12,.0f} оп/с'
+            )
+
+    def handle(self, *args, **options):
+        ops = options['ops']
+        processes = options['processes']
+        options = {'MAX_ENTRIES': ops * (processes + 1) + 10}
+
+        self.report(
+            'LocMemCache, 1 процесс',
+            run_operations(
+                LocMemCache('bench', {'OPTIONS': options}), ops
+            ),
+            ops,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            self.report(
+                'SQLiteCache, 1 процесс',
+                run_operations(SQLiteCache(path, {'OPTIONS': options}), ops),
+                ops,
+            )
+
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            workers = [
+                context.Process(
+                    target=worker, args=(path, ops, options, queue)
+                )
+                for _ in range(processes)
+            ]
+            for process in workers:
+                process.start()
+            results = [queue.get() for _ in workers]
+            for process in workers:
+                process.join()
+            # Суммарная пропускная способность всех процессов
+            self.report(
+                f'SQLiteCache, {processes} процесса(ов), суммарно',
+                {
+                    operation: max(
+                        result[operation] for result in results
+                    ) / processes
+                    for operation in results[0]
+                },
+                ops,
+            )
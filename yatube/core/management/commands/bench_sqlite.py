@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmark import percentile
+from core.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    ' id INTEGER PRIMARY KEY,'
+    ' author_id INTEGER NOT NULL,'
+    ' text TEXT NOT NULL,'
+    ' pub_date REAL NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    'CREATE INDEX post_author ON post (author_id, pub_date)',
+)
+# Как на страницах ленты: страница постов по дате
+READ = (
+    'SELECT id, author_id, text, pub_date FROM post '
+    'ORDER BY pub_date DESC LIMIT 10 OFFSET ?'
+)
+READ_AUTHOR = (
+    'SELECT id, text, pub_date FROM post WHERE author_id = ? '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+WRITE = 'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)'
+AUTHORS = 500
+PAGES = 20
+TEXT = 'x' * 400
+
+
+def _create(path: str, rows: int, pragmas) -> None:
+    connection = sqlite3.connect(path)
+    apply_pragmas(connection, pragmas)
+    connection.executescript(';'.join(SCHEMA))
+    now = time.time()
+    connection.executemany(WRITE, (
+        (random.randrange(AUTHORS), TEXT, now - number)
+        for number in range(rows)
+    ))
+    connection.commit()
+    connection.close()
+
+
+class Profile:
+    """Как рабочий процесс сайта открывает базу."""
+
+    def __init__(self, name, pragmas, persistent):
+        self.name = name
+        self.pragmas = pragmas
+        self.persistent = persistent
+        self.path = None
+        self._connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        apply_pragmas(connection, self.pragmas)
+        if self.persistent:
+            self._connection = connection
+        return connection
+
+    def release(self, connection) -> None:
+        if not self.persistent:
+            connection.close()
+
+
+PROFILES = (
+    # Настройки Django по умолчанию: журнал отката, соединение на запрос
+    Profile('по умолчанию', {}, persistent=False),
+    Profile(
+        'рабочий профиль', settings.SQLITE_PRODUCTION_PRAGMAS,
+        persistent=True,
+    ),
+)
+
+
+def _operation(profile, writer: bool, rows: int):
+    connection = profile.connect()
+    try:
+        if writer:
+            connection.execute(
+                WRITE, (random.randrange(AUTHORS), TEXT, time.time())
+            )
+        elif random.random() < 0.5:
+            # Дальше первых страниц читают редко
+            connection.execute(
+                READ, (random.randrange(min(rows // 10, PAGES)) * 10,)
+            ).fetchall()
+        else:
+            connection.execute(
+                READ_AUTHOR, (random.randrange(AUTHORS),)
+            ).fetchall()
+    finally:
+        profile.release(connection)
+
+
+def worker(profile, writer, rows, seconds, queue):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            _operation(profile, writer, rows)
+        except sqlite3.OperationalError:
+            # database is locked: запрос сайта упал бы с ошибкой 500
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    queue.put((writer, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при одновременных '
+        'чтениях и записях с настройками по умолчанию и рабочим профилем'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def report(self, name, results, seconds):
+        self.stdout.write(name)
+        for writer, title in ((False, 'чтение'), (True, 'запись')):
+            latencies = [
+                latency for is_writer, values, _ in results
+                if is_writer == writer for latency in values
+            ]
+            errors = sum(
+                count for is_writer, _, count in results
+                if is_writer == writer
+            )
+            p95 = (
+                percentile(latencies, 95) * 1000
+                if len(latencies) > 1 else 0
+            )
+            self.stdout.write(
+                f'  {title:<8}{len(latencies) / seconds:>10,.0f} оп/с'
+                f'{p95:>10.2f} мс p95{errors:>8} ошибок блокировки'
+            )
+
+    def handle(self, *args, **options):
+        seconds, rows = options['seconds'], options['rows']
+        roles = [False] * options['readers'] + [True] * options['writers']
+        context = multiprocessing.get_context('fork')
+        for profile in PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                profile.path = os.path.join(directory, 'bench.sqlite3')
+                _create(profile.path, rows, profile.pragmas)
+                queue = context.Queue()
+                workers = [
+                    context.Process(
+                        target=worker,
+                        args=(profile, writer, rows, seconds, queue),
+                    )
+                    for writer in roles
+                ]
+                for process in workers:
+                    process.start()
+                results = [queue.get() for _ in workers]
+                for process in workers:
+                    process.join()
+            self.report(profile.name, results, seconds)
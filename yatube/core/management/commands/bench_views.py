@@ -0,0 +1,97 @@
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import benchmark
+
+RESULTS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+COLUMNS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean', 'memory_peak_kib')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и память представлений постов '
+        'на текущей базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=[scenario.name for scenario in benchmark.SCENARIOS],
+            help='Замерить только эти сценарии'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help=f'Файл результатов, по умолчанию в {RESULTS_DIR}'
+        )
+        parser.add_argument(
+            '--compare', help='Сравнить с сохранёнными результатами'
+        )
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<16}'
+            + ''.join(f'{result[column]:>16.1f}' for column in COLUMNS)
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"":<16}' + ''.join(f'{column:>16}' for column in COLUMNS)
+        )
+        commit = benchmark.git_commit()
+        results = benchmark.run(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            scenarios=options['scenario'],
+            seed=options['seed'],
+            report=self.report,
+        )
+
+        path = options['output'] or os.path.join(
+            RESULTS_DIR, f'{datetime.now():%Y%m%d-%H%M%S}-{commit}.json'
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'commit': commit,
+                    'date': datetime.now().isoformat(),
+                    'requests': options['requests'],
+                    'results': results,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {path}'))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        self.stdout.write(f'Изменение относительно {baseline["commit"]}:')
+        for name, result in results.items():
+            before = baseline['results'].get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{name:<16}' + ''.join(
+                    f'{self.delta(before[column], result[column]):>16}'
+                    for column in COLUMNS
+                )
+            )
+
+    @staticmethod
+    def delta(before, after) -> str:
+        if not before:
+            return f'{after:+.1f}'
+        return f'{(after - before) / before:+.0%}'
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.benchmark import percentile
+from core.writes import is_locked
+from posts.models import Post, User
+
+# Доли действий посетителей: пост, комментарий, подписка, отписка
+ACTIONS = (('post', 4), ('comment', 3), ('follow', 2), ('unfollow', 1))
+
+
+def _request(client, action, authors, posts):
+    if action == 'post':
+        return client.post(
+            reverse('posts:post_create'), {'text': 'Нагрузка ' * 20}
+        )
+    if action == 'comment':
+        return client.post(
+            reverse('posts:add_comment', args=(random.choice(posts),)),
+            {'text': 'Комментарий под нагрузкой'},
+        )
+    return client.get(
+        reverse(f'posts:profile_{action}', args=(random.choice(authors),))
+    )
+
+
+def _visitor(session, requests, authors, posts, results):
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session
+    names, weights = zip(*ACTIONS)
+    for action in random.choices(names, weights, k=requests):
+        started = time.perf_counter()
+        try:
+            response = _request(client, action, authors, posts)
+        except Exception as error:
+            results['locked' if is_locked(error) else 'errors'] += 1
+            continue
+        if response.status_code >= 500:
+            results['errors'] += 1
+            continue
+        results['latencies'].append(time.perf_counter() - started)
+    connections.close_all()
+
+
+def worker(sessions, requests, authors, posts, queue):
+    visitors = [
+        {'latencies': [], 'locked': 0, 'errors': 0} for _ in sessions
+    ]
+    threads = [
+        threading.Thread(
+            target=_visitor,
+            args=(session, requests, authors, posts, results),
+        )
+        for session, results in zip(sessions, visitors)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.store.flush()
+    for results in visitors:
+        queue.put(results)
+
+
+def _prepare(visitors: int):
+    """Пользователи с постами и их сессии во временной базе."""
+    call_command('migrate', verbosity=0)
+    sessions, authors, posts = [], [], []
+    for number in range(visitors):
+        user = User.objects.create_user(f'stress{number}')
+        authors.append(user.username)
+        posts.append(Post.objects.create(author=user, text='Пост').pk)
+        client = Client()
+        client.force_login(user)
+        sessions.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+    return sessions, authors, posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Одновременные посты, комментарии и подписки через представления '
+        'сайта на временной базе; считает ошибки «database is locked»'
+    )
+    # База подменяется до первого соединения
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=2)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов на каждый поток',
+        )
+        parser.add_argument(
+            '--no-coordination', action='store_true',
+            help='Без core.writes: для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        processes, threads = options['processes'], options['threads']
+        database = connections[DEFAULT_DB_ALIAS].settings_dict
+        original = database['NAME']
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            DEBUG=False,
+            DATABASE_REPLICAS=[],
+            DUPLICATE_QUERIES=None,
+            # Нагрузку держит рабочий профиль SQLite
+            SQLITE_PRAGMAS=settings.SQLITE_PRODUCTION_PRAGMAS,
+            PERFORMANCE_SAMPLE_RATE=0,
+            PERFORMANCE_SLOW_MS=float('inf'),
+            WRITE_COORDINATION=not options['no_coordination'],
+            METRICS_DB=os.path.join(directory, 'metrics.sqlite3'),
+            MEDIA_ROOT=os.path.join(directory, 'media'),
+            CACHES={'default': {
+                **settings.CACHES['default'],
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            }},
+        ):
+            database['NAME'] = os.path.join(directory, 'db.sqlite3')
+            try:
+                sessions, authors, posts = _prepare(processes * threads)
+                connections.close_all()
+                results, elapsed = self.run(
+                    sessions, threads, options['requests'], authors, posts
+                )
+                retries = sum(
+                    value for _, value in metrics.store.read().get(
+                        metrics.DB_WRITE_RETRIES.name, ()
+                    )
+                )
+            finally:
+                connections.close_all()
+                database['NAME'] = original
+        self.report(results, elapsed, retries)
+
+    def run(self, sessions, threads, requests, authors, posts):
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        workers = [
+            context.Process(
+                target=worker,
+                args=(
+                    sessions[start:start + threads], requests, authors,
+                    posts, queue,
+                ),
+            )
+            for start in range(0, len(sessions), threads)
+        ]
+        started = time.perf_counter()
+        for process in workers:
+            process.start()
+        results = [queue.get() for _ in sessions]
+        for process in workers:
+            process.join()
+        return results, time.perf_counter() - started
+
+    def report(self, results, elapsed, retries):
+        latencies = [
+            latency for result in results for latency in result['latencies']
+        ]
+        p95 = (
+            percentile(latencies, 95) * 1000
+            if len(latencies) > 1 else 0
+        )
+        self.stdout.write(
+            f'успешных запросов: {len(latencies)} '
+            f'({len(latencies) / elapsed:,.0f} в секунду, p95 {p95:.0f} мс)'
+        )
+        self.stdout.write(f'повторов записи: {retries:.0f}')
+        self.stdout.write(
+            'ошибок блокировки: '
+            f'{sum(result["locked"] for result in results)}'
+        )
+        self.stdout.write(
+            f'других ошибок: {sum(result["errors"] for result in results)}'
+        )
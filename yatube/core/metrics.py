@@ -0,0 +1,291 @@
+"""Метрики сайта в текстовом формате Prometheus.
+
+Каждый процесс сервера копит приращения метрик в памяти и раз в
+METRICS_FLUSH_INTERVAL секунд прибавляет их к общим значениям в файле
+SQLite METRICS_DB, поэтому /metrics показывает сумму по всем процессам
+хоста без внешних сервисов. Значения датчиков (gauge) хранятся для
+каждого процесса отдельно и складываются при выдаче; датчики процесса,
+не обновлявшиеся METRICS_GAUGE_TTL секунд, считаются устаревшими.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS samples ('
+    ' name TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' PRIMARY KEY (name, labels)'
+    ') WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS gauges ('
+    ' name TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' pid INTEGER NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' updated REAL NOT NULL,'
+    ' PRIMARY KEY (name, labels, pid)'
+    ') WITHOUT ROWID',
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+PROCESSING_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+# Метка le среди остальных в строке меток
+LE = re.compile(r'(?:^|,)le="([^"]*)"')
+
+
+def _labels(**labels) -> str:
+    return ','.join(
+        f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())
+    )
+
+
+class Store:
+    """Накопленные в процессе приращения и их запись в общий файл."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._increments = defaultdict(float)
+        self._gauges = {}
+        self._flushed = time.monotonic()
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if (getattr(local, 'pid', None) != os.getpid()
+                or getattr(local, 'path', None) != settings.METRICS_DB):
+            connection = sqlite3.connect(
+                settings.METRICS_DB, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+            local.path = settings.METRICS_DB
+        return local.connection
+
+    def add(self, name: str, labels: str, value: float) -> None:
+        with self._lock:
+            self._increments[name, labels] += value
+        self.flush_if_due()
+
+    def set(self, name: str, labels: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name, labels] = value
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        if time.monotonic() - self._flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            increments, self._increments = self._increments, defaultdict(
+                float
+            )
+            gauges = dict(self._gauges)
+            self._flushed = time.monotonic()
+        pid, now = os.getpid(), time.time()
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) '
+                'DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value)
+                 for (name, labels), value in increments.items()],
+            )
+            connection.executemany(
+                'INSERT OR REPLACE INTO gauges '
+                '(name, labels, pid, value, updated) VALUES (?, ?, ?, ?, ?)',
+                [(name, labels, pid, value, now)
+                 for (name, labels), value in gauges.items()],
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def read(self):
+        """Суммы по всем процессам: {имя: [(метки, значение), ...]}."""
+        self.flush()
+        values = defaultdict(list)
+        rows = self._connection.execute(
+            'SELECT name, labels, value FROM samples '
+            'UNION ALL '
+            'SELECT name, labels, SUM(value) FROM gauges WHERE updated > ? '
+            'GROUP BY name, labels '
+            'ORDER BY name, labels',
+            (time.time() - settings.METRICS_GAUGE_TTL,),
+        )
+        for name, labels, value in rows:
+            values[name].append((labels, value))
+        return values
+
+
+store = Store()
+atexit.register(lambda: store.flush() if store._increments else None)
+
+# Метрики в порядке выдачи
+REGISTRY = []
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY.append(self)
+
+    def sample_names(self):
+        return [self.name]
+
+    def ordered(self, name: str, samples) -> list:
+        """Значения ряда name в порядке выдачи."""
+        return samples
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, value: float = 1, **labels) -> None:
+        store.add(self.name, _labels(**labels), value)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        store.set(self.name, _labels(**labels), value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def sample_names(self):
+        return [f'{self.name}_bucket', f'{self.name}_sum',
+                f'{self.name}_count']
+
+    def ordered(self, name: str, samples) -> list:
+        if name != f'{self.name}_bucket':
+            return samples
+        # Из базы корзины приходят в порядке строк: le="10" раньше
+        # le="2.5"; Prometheus ждёт их по возрастанию границы
+        return sorted(samples, key=lambda sample: (
+            LE.sub('', sample[0]), float(LE.search(sample[0]).group(1))
+        ))
+
+    def observe(self, value: float, **labels) -> None:
+        # Корзины накопительные: значение попадает во все, где le >= него
+        for bound in self.buckets:
+            if value <= bound:
+                store.add(
+                    f'{self.name}_bucket', _labels(le=bound, **labels), 1
+                )
+        store.add(f'{self.name}_bucket', _labels(le='+Inf', **labels), 1)
+        store.add(f'{self.name}_sum', _labels(**labels), value)
+        store.add(f'{self.name}_count', _labels(**labels), 1)
+
+
+def _value(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def exposition() -> str:
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    values = store.read()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name in metric.sample_names():
+            for labels, value in metric.ordered(name, values.get(name, [])):
+                labels = f'{{{labels}}}' if labels else ''
+                lines.append(f'{name}{labels} {_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+REQUESTS = Counter(
+    'yatube_http_requests_total', 'Обработанные запросы к сайту.'
+)
+REQUEST_DURATION = Histogram(
+    'yatube_http_request_duration_seconds',
+    'Время обработки запроса по имени адреса.',
+    LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter(
+    'yatube_db_queries_total', 'SQL-запросы при обработке запросов к сайту.'
+)
+DB_WRITE_RETRIES = Counter(
+    'yatube_db_write_retries_total',
+    'Повторы записей в базу после ошибки «database is locked».',
+)
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests_total',
+    'Чтения ключей кэша по видам кэша: попадания и промахи.',
+)
+IMAGE_PROCESSING = Histogram(
+    'yatube_image_processing_seconds',
+    'Время обработки загруженной картинки и создания её превью.',
+    PROCESSING_BUCKETS,
+)
+THUMBNAIL_QUEUE = Gauge(
+    'yatube_thumbnail_queue_depth',
+    'Картинки, ждущие обработки или обрабатываемые в фоне.',
+)
+
+
+def cache_kind(key: str) -> str:
+    """Вид кэша по ключу: фрагмент шаблона, страница, карточка поста..."""
+    # Ключ бэкенда начинается с префикса и версии: ':1:post_card:...'
+    key = key.split(':', 2)[-1]
+    if key.startswith('template.cache.'):
+        return 'fragment:' + key.split('.')[2]
+    for separator in (':', '|', '.'):
+        key = key.split(separator, 1)[0]
+    return key
+
+
+def record_cache(keys, found) -> None:
+    counts = defaultdict(lambda: [0, 0])
+    for key in keys:
+        counts[cache_kind(key)][key not in found] += 1
+    for kind, (hits, misses) in counts.items():
+        if hits:
+            CACHE_REQUESTS.inc(hits, cache=kind, result='hit')
+        if misses:
+            CACHE_REQUESTS.inc(misses, cache=kind, result='miss')
+
+
+def record_request(view: str, method: str, status: int, duration: float,
+                   queries: int) -> None:
+    REQUESTS.inc(view=view, method=method, status=status)
+    REQUEST_DURATION.observe(duration, view=view)
+    if queries:
+        DB_QUERIES.inc(queries, view=view)
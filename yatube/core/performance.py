@@ -0,0 +1,151 @@
+"""Замеры производительности каждого запроса.
+
+PerformanceMiddleware считает для запроса число и время SQL-запросов,
+попадания и промахи кэша, время отрисовки шаблонов и общее время. Итог
+отдаётся браузеру в заголовке Server-Timing и пишется в журнал
+core.performance строкой JSON: для доли запросов PERFORMANCE_SAMPLE_RATE
+и для всех запросов медленнее PERFORMANCE_SLOW_MS. Замеры дешёвые, их
+можно не выключать под нагрузкой.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from core import metrics as site_metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('performance_metrics', default=None)
+
+
+class Metrics:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка execute_wrapper для всех запросов соединения
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def record_cache(hits: int, misses: int, duration: float) -> None:
+    """Учитывает чтение из кэша в замерах текущего запроса."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+        metrics.cache_time += duration
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Вложенные шаблоны уже учтены во времени внешнего
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Обычный движок шаблонов Django с замером времени отрисовки."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def server_timing(metrics: Metrics, total: float) -> str:
+    return ', '.join((
+        f'db;dur={_ms(metrics.query_time)};desc="{metrics.queries} SQL"',
+        f'cache;dur={_ms(metrics.cache_time)};'
+        f'desc="{metrics.cache_hits} hit {metrics.cache_misses} miss"',
+        f'tpl;dur={_ms(metrics.template_time)}',
+        f'total;dur={_ms(total)}',
+    ))
+
+
+def _record(request, response, metrics: Metrics, total: float) -> dict:
+    match = request.resolver_match
+    return {
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'total_ms': _ms(total),
+        'db_queries': metrics.queries,
+        'db_ms': _ms(metrics.query_time),
+        'cache_hits': metrics.cache_hits,
+        'cache_misses': metrics.cache_misses,
+        'cache_ms': _ms(metrics.cache_time),
+        'template_ms': _ms(metrics.template_time),
+    }
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = Metrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        site_metrics.record_request(
+            match.view_name if match else 'unresolved',
+            request.method,
+            response.status_code,
+            total,
+            metrics.queries,
+        )
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, total)
+        if (
+            total * 1000 >= settings.PERFORMANCE_SLOW_MS
+            or random.random() < settings.PERFORMANCE_SAMPLE_RATE
+        ):
+            logger.info(json.dumps(_record(request, response, metrics, total)))
+        return response
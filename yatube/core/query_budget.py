@@ -0,0 +1,68 @@
+"""Бюджет SQL-запросов на обработку одного запроса к сайту.
+
+Бюджет — наибольшее число запросов и наибольшее суммарное время SQL.
+Число запросов не должно зависеть от размера страницы: запрос на
+каждый пост списка (N+1) выходит за бюджет уже на одной странице.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# Суммарное время SQL одного запроса по умолчанию, мс
+DEFAULT_TIME_MS = 200
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _describe(captured, problems) -> str:
+    lines = [f'{problem}.' for problem in problems]
+    lines.append('Запросы:')
+    for number, query in enumerate(captured, 1):
+        lines.append(
+            f'{number}. [{float(query["time"]) * 1000:.1f} мс] '
+            f'{query["sql"]}'
+        )
+    return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(queries: int, time_ms: float = DEFAULT_TIME_MS,
+                 label: str = '', using: str = DEFAULT_DB_ALIAS):
+    """Проверяет, что код внутри блока уложился в бюджет.
+
+    При превышении бросает QueryBudgetExceeded со списком всех
+    выполненных запросов и их временем.
+    """
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+
+    prefix = f'{label}: ' if label else ''
+    problems = []
+    if len(captured) > queries:
+        problems.append(
+            f'{prefix}{len(captured)} SQL-запросов при бюджете {queries}'
+        )
+    total_ms = sum(
+        float(query['time']) for query in captured.captured_queries
+    ) * 1000
+    if total_ms > time_ms:
+        problems.append(
+            f'{prefix}SQL занял {total_ms:.1f} мс при бюджете {time_ms} мс'
+        )
+    if problems:
+        raise QueryBudgetExceeded(_describe(captured, problems))
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    def assertQueryBudget(self, url, queries, time_ms=DEFAULT_TIME_MS,
+                          method='get', data=None, client=None):
+        client = client or self.client
+        with query_budget(queries, time_ms, label=f'{method.upper()} {url}'):
+            response = getattr(client, method)(url, data)
+        self.assertLess(response.status_code, 400, url)
+        return response
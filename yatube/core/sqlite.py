@@ -0,0 +1,24 @@
+"""Настройка соединений SQLite для работы под нагрузкой.
+
+Прагмы из SQLITE_PRAGMAS выполняются на каждом новом соединении. Вместе
+с постоянными соединениями (CONN_MAX_AGE) это значит — один раз на
+соединение, а не на каждый запрос к сайту. Обе настройки задаёт рабочий
+профиль (YATUBE_SQLITE_PROFILE=production), по умолчанию прагм нет.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas) -> None:
+    """Выполняет прагмы на соединении sqlite3 в заданном порядке."""
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        # Напрямую через sqlite3: служебные запросы не нужны ни в
+        # замерах, ни в поиске повторов
+        apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
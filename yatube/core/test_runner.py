@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner as BaseDiscoverRunner
+
+
+class DiscoverRunner(BaseDiscoverRunner):
+    """Тесты падают на новых N+1 и повторах SQL в обработке запросов.
+
+    Реплики в тестах не используются: соединение реплики не видит данных
+    незавершённой транзакции TestCase.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.DUPLICATE_QUERIES = 'raise'
+        settings.DATABASE_REPLICAS = []
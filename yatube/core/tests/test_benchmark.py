@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import shutil
+import random
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+
+from core import benchmark, writes
+from posts import dataset
+from posts.models import Comment, Follow, Post, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        dataset.generate(
+            users=10, groups=2, posts=40, comments=40, follows=3,
+            image_ratio=0, seed=1,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_run_measures_every_scenario(self):
+        """Прогон возвращает метрики всех сценариев."""
+        results = benchmark.run(requests=2, warmup=0)
+        self.assertEqual(
+            set(results),
+            {scenario.name for scenario in benchmark.SCENARIOS},
+        )
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['memory_peak_kib'], 0)
+        self.assertGreater(results['index']['queries_mean'], 0)
+
+    def test_lists_paged_by_cursor(self):
+        """Списки листаются курсорами, а не номерами страниц."""
+        sample = benchmark.Sample(random.Random(0))
+        for scenario in benchmark.SCENARIOS:
+            if scenario.name not in ('index', 'profile', 'follow_index'):
+                continue
+            with self.subTest(scenario=scenario.name):
+                params = [
+                    scenario.make_request(sample)[2] for _ in range(20)
+                ]
+                self.assertTrue(any('cursor' in data for data in params))
+                self.assertFalse(any('page' in data for data in params))
+
+    def test_command_saves_and_compares_results(self):
+        """Команда сохраняет результаты и сравнивает их с прошлыми."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'results.json')
+        options = {'requests': 2, 'warmup': 0, 'scenario': ['post_detail']}
+        call_command('bench_views', output=path, stdout=io.StringIO(),
+                     **options)
+        with open(path) as file:
+            saved = json.load(file)
+        self.assertEqual(list(saved['results']), ['post_detail'])
+
+        stdout = io.StringIO()
+        call_command(
+            'bench_views', output=path, compare=path, stdout=stdout,
+            **options
+        )
+        self.assertIn('Изменение относительно', stdout.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, DUPLICATE_QUERIES=None)
+class BenchmarkWritesTest(TransactionTestCase):
+    def setUp(self):
+        dataset.generate(
+            users=5, groups=1, posts=10, comments=5, follows=2,
+            image_ratio=0, seed=1,
+        )
+
+    def counts(self):
+        return [
+            model.objects.count() for model in (Post, Comment, Follow)
+        ] + list(UserStats.objects.order_by('pk').values_list(
+            'posts_count', 'followers_count', 'following_count'
+        )) + list(Post.objects.order_by('pk').values_list('text'))
+
+    def test_writes_go_through_write_view_and_are_removed(self):
+        """Записи идут через write_view без внешней транзакции, созданное
+        ими удаляется в конце прогона."""
+        before = self.counts()
+        with mock.patch.object(
+            writes, '_attempt', wraps=writes._attempt
+        ) as attempt:
+            benchmark.run(
+                requests=2, warmup=1,
+                scenarios=[
+                    'post_create', 'post_edit', 'add_comment',
+                    'profile_follow',
+                ],
+            )
+        self.assertTrue(attempt.called)
+        self.assertEqual(self.counts(), before)
+
+
+class PercentileTest(SimpleTestCase):
+    def test_interpolates_between_values(self):
+        """Перцентили как у statistics.quantiles(method='inclusive')."""
+        values = [4, 1, 3, 2]
+        self.assertEqual(benchmark.percentile(values, 0), 1)
+        self.assertEqual(benchmark.percentile(values, 50), 2.5)
+        self.assertEqual(benchmark.percentile(values, 100), 4)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
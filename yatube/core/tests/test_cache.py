@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def incr_many(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(
+            self.path, {'OPTIONS': {'MAX_ENTRIES': 9, 'CULL_EVERY': 1}}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        cache = self.cache
+        cache.set('a', {'value': 1})
+        cache.set_many({'b': 2, 'c': 3})
+        self.assertEqual(cache.get('a'), {'value': 1})
+        self.assertEqual(cache.get_many(['a', 'b', 'x']), {
+            'a': {'value': 1}, 'b': 2
+        })
+        self.assertFalse(cache.add('b', 5))
+        self.assertTrue(cache.add('d', 4))
+        self.assertEqual(cache.incr('b', 10), 12)
+        self.assertEqual(cache.decr('b'), 11)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        cache.clear()
+        self.assertEqual(cache.get_many(['b', 'c', 'd']), {})
+
+    def test_shared_between_instances(self):
+        """Второй экземпляр (как другой процесс) видит те же данные."""
+        self.cache.set('key', 'value')
+        other = SQLiteCache(self.path, {})
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_timeout_expires_entries(self):
+        self.cache.set('key', 'value', 0.05)
+        self.cache.set('forever', 'value', None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_least_recently_used_entries_culled(self):
+        for i in range(9):
+            self.cache.set(f'key{i}', i)
+        # Недавнее чтение защищает ключ от вытеснения
+        self.cache._connection.execute('UPDATE cache SET accessed = 0')
+        self.cache.get('key0')
+        self.cache.set('key9', 9)
+        self.assertEqual(self.cache.get('key0'), 0)
+        self.assertEqual(self.cache.get('key9'), 9)
+        self.assertIsNone(self.cache.get('key1'))
+
+    def test_cull_checks_size_every_n_writes(self):
+        """Размер кэша проверяется только на каждой CULL_EVERY-й записи."""
+        cache = SQLiteCache(
+            self.path, {'OPTIONS': {'MAX_ENTRIES': 9, 'CULL_EVERY': 20}}
+        )
+        for i in range(19):
+            cache.set(f'key{i}', i)
+        count = 'SELECT COUNT(*) FROM cache'
+        self.assertEqual(cache._connection.execute(count).fetchone()[0], 19)
+        cache.set('key19', 19)
+        self.assertLessEqual(
+            cache._connection.execute(count).fetchone()[0], 9
+        )
+
+    def test_cull_counts_writes_across_instances(self):
+        """Записи считаются на весь процесс, а не на экземпляр кэша:
+        Django создаёт экземпляр на каждый поток."""
+        options = {'OPTIONS': {'MAX_ENTRIES': 9, 'CULL_EVERY': 20}}
+        for i in range(20):
+            SQLiteCache(self.path, options).set(f'key{i}', i)
+        count = 'SELECT COUNT(*) FROM cache'
+        self.assertLessEqual(
+            self.cache._connection.execute(count).fetchone()[0], 9
+        )
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=incr_many, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class RuntimeFilesTest(SimpleTestCase):
+    def test_tests_keep_away_from_site_files(self):
+        """Кэш, метрики и журнал замеров тестов — не файлы сайта."""
+        for path in (
+            settings.CACHES['default']['LOCATION'],
+            settings.METRICS_DB,
+            settings.LOGGING['handlers']['performance']['filename'],
+        ):
+            with self.subTest(path=path):
+                self.assertNotEqual(os.path.dirname(path), settings.BASE_DIR)
@@ -0,0 +1,65 @@
+from django.db import DEFAULT_DB_ALIAS, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db_router import STICKY_COOKIE, ReplicaMiddleware
+from posts.models import Post
+
+
+def read_view(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_then_read_view(request):
+    before = router.db_for_read(Post)
+    router.db_for_write(Post)
+    return HttpResponse(f'{before} {router.db_for_read(Post)}')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTest(SimpleTestCase):
+    def call(self, view, method='get', cookies=None):
+        factory = RequestFactory()
+        for name, value in (cookies or {}).items():
+            factory.cookies[name] = value
+        request = getattr(factory, method)('/')
+        return ReplicaMiddleware(view)(request)
+
+    def test_reads_go_to_replica(self):
+        """Чтения при просмотре страниц идут на реплики."""
+        used = {self.call(read_view).content.decode() for _ in range(50)}
+        self.assertEqual(used, {'replica1', 'replica2'})
+
+    def test_writes_go_to_primary(self):
+        """Запись идёт в основную базу, следующие чтения — тоже."""
+        response = self.call(write_then_read_view)
+        before, after = response.content.decode().split()
+        self.assertIn(before, ('replica1', 'replica2'))
+        self.assertEqual(after, DEFAULT_DB_ALIAS)
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 10)
+
+    def test_session_reads_primary_after_write(self):
+        """После записи сессия какое-то время читает основную базу."""
+        response = self.call(read_view, cookies={STICKY_COOKIE: '1'})
+        self.assertEqual(response.content.decode(), DEFAULT_DB_ALIAS)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_unsafe_methods_read_primary(self):
+        """Запросы, меняющие данные, читают основную базу."""
+        response = self.call(read_view, method='post')
+        self.assertEqual(response.content.decode(), DEFAULT_DB_ALIAS)
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые задачи читают основную базу."""
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        """Без реплик всё идёт в основную базу."""
+        response = self.call(read_view)
+        self.assertEqual(response.content.decode(), DEFAULT_DB_ALIAS)
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции применяются только к основной базе."""
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'posts'))
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
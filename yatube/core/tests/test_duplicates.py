@@ -0,0 +1,84 @@
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.duplicates import (
+    DuplicateQueries,
+    DuplicateQueriesMiddleware,
+    allow_duplicates,
+    shape,
+)
+from posts.models import Post, User
+
+# Шаблон с N+1: автор каждого поста читается отдельным запросом
+AUTHORS = Template(
+    '{% for post in posts %}\n{{ post.author.username }}\n{% endfor %}'
+)
+
+
+def authors_view(request):
+    return HttpResponse(
+        AUTHORS.render(Context({'posts': Post.objects.all()}))
+    )
+
+
+def repeated_view(request):
+    for _ in range(2):
+        Post.objects.filter(pk=1).exists()
+    return HttpResponse()
+
+
+def allowed_view(request):
+    with allow_duplicates():
+        return authors_view(request)
+
+
+@override_settings(DUPLICATE_QUERIES='raise', DUPLICATE_QUERIES_THRESHOLD=3)
+class DuplicateQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            Post.objects.create(
+                author=User.objects.create_user(username=f'author{number}'),
+                text='Пост',
+            )
+
+    def call(self, view):
+        request = RequestFactory().get('/')
+        return DuplicateQueriesMiddleware(view)(request)
+
+    def test_shape_ignores_values(self):
+        """Форма запроса не зависит от значений и длины списка IN."""
+        self.assertEqual(
+            shape('SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 10'),
+            shape("SELECT * FROM t WHERE id IN (%s) AND x = 'y'"),
+        )
+
+    def test_n_plus_one_raises_with_location(self):
+        """N+1 в шаблоне называет строку шаблона и место в коде."""
+        with self.assertRaises(DuplicateQueries) as raised:
+            self.call(authors_view)
+        message = str(raised.exception)
+        self.assertIn('3 запросов одной формы', message)
+        self.assertIn('FROM "auth_user"', message)
+        self.assertIn('<unknown source>:2', message)
+        self.assertIn('core/tests/test_duplicates.py', message)
+
+    def test_identical_queries_raise(self):
+        """Одинаковый запрос дважды — тоже повтор."""
+        with self.assertRaisesMessage(
+            DuplicateQueries, '2 одинаковых запросов'
+        ):
+            self.call(repeated_view)
+
+    def test_allowed_duplicates_pass(self):
+        """Повторы внутри allow_duplicates не проверяются."""
+        self.assertEqual(self.call(allowed_view).status_code, 200)
+
+    @override_settings(DUPLICATE_QUERIES='warn')
+    def test_warn_mode_logs_report(self):
+        """В режиме warn отчёт пишется в журнал, ответ не меняется."""
+        with self.assertLogs('core.duplicates', 'WARNING') as logs:
+            response = self.call(authors_view)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('запросов одной формы', logs.output[0])
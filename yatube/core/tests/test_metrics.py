@@ -0,0 +1,151 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    METRICS_DB=os.path.join(TEMP_DIR, 'metrics.sqlite3'),
+    METRICS_FLUSH_INTERVAL=0,
+)
+class MetricsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.store.flush()
+        with sqlite3.connect(os.path.join(TEMP_DIR, 'metrics.sqlite3')) as db:
+            db.execute('DELETE FROM samples')
+            db.execute('DELETE FROM gauges')
+
+    def scrape(self) -> str:
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_requests_are_counted_per_view(self):
+        """Запросы, их время и SQL считаются по имени адреса."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{method="GET",status="200",view="post:index"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="post:index"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{le="+Inf",view="post:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_db_queries_total{view="post:index"}', text)
+        self.assertIn('# TYPE yatube_http_request_duration_seconds '
+                      'histogram', text)
+
+    def test_cache_hits_by_kind(self):
+        """Попадания и промахи кэша считаются по видам кэша."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.get(url)
+        text = self.scrape()
+        self.assertIn(
+            'yatube_cache_requests_total{cache="page",result="hit"} 1', text
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{cache="fragment:index_page",'
+            'result="miss"} 1',
+            text,
+        )
+
+    def test_values_of_all_processes_are_summed(self):
+        """Значения, записанные другими процессами, складываются."""
+        metrics.REQUESTS.inc(view='other', method='GET', status=200)
+        metrics.store.flush()
+        with sqlite3.connect(os.path.join(TEMP_DIR, 'metrics.sqlite3')) as db:
+            db.execute(
+                'UPDATE samples SET value = value + 4 WHERE name = ? '
+                'AND labels LIKE ?',
+                ('yatube_http_requests_total', '%"other"%'),
+            )
+            # Датчик живого процесса и устаревший датчик умершего
+            db.executemany(
+                'INSERT INTO gauges VALUES (?, ?, ?, ?, ?)',
+                [
+                    ('yatube_thumbnail_queue_depth', '', 1, 3, time.time()),
+                    ('yatube_thumbnail_queue_depth', '', 2, 7, 0),
+                ],
+            )
+        metrics.THUMBNAIL_QUEUE.set(2)
+        text = self.scrape()
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{method="GET",status="200",view="other"} 5',
+            text,
+        )
+        self.assertIn('yatube_thumbnail_queue_depth 5', text)
+
+    def test_cache_kind(self):
+        """Вид кэша определяется по ключу."""
+        for key, kind in (
+            (':1:post_card:12:1.5', 'post_card'),
+            (':1:template.cache.index_page.abc', 'fragment:index_page'),
+            (':1:sorl-thumbnail||image||abc', 'sorl-thumbnail'),
+        ):
+            with self.subTest(key=key):
+                self.assertEqual(metrics.cache_kind(key), kind)
+
+    def test_metrics_are_hidden_from_other_hosts(self):
+        """Чужим адресам страница метрик не видна."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required_when_configured(self):
+        """С токеном адрес 127.0.0.1 ничего не даёт, нужен заголовок."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_histogram_buckets_in_numeric_order(self):
+        """Корзины гистограммы идут по возрастанию границы."""
+        metrics.REQUEST_DURATION.observe(0.001, view='a')
+        metrics.REQUEST_DURATION.observe(0.001, view='b')
+        bounds = re.findall(
+            r'yatube_http_request_duration_seconds_bucket'
+            r'\{le="([^"]+)",view="a"\}',
+            self.scrape(),
+        )
+        self.assertEqual(
+            bounds,
+            [str(bound) for bound in metrics.LATENCY_BUCKETS] + ['+Inf'],
+        )
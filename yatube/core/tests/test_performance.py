@@ -0,0 +1,76 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=0, PERFORMANCE_SLOW_MS=10 ** 6)
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def timings(response) -> dict:
+        timings = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            timings[name] = dict(param.split('=', 1) for param in params)
+        return timings
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing со всеми метриками."""
+        self.client.force_login(self.author)
+        timings = self.timings(self.client.get(reverse('posts:index')))
+        self.assertEqual(set(timings), {'db', 'cache', 'tpl', 'total'})
+        self.assertNotEqual(timings['db']['desc'], '"0 SQL"')
+        self.assertGreater(float(timings['tpl']['dur']), 0)
+        self.assertGreaterEqual(
+            float(timings['total']['dur']), float(timings['tpl']['dur'])
+        )
+
+    def test_cached_page_counts_cache_hit(self):
+        """Страница из кэша видна как попадание без SQL-запросов."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        timings = self.timings(self.client.get(url))
+        self.assertEqual(timings['db']['desc'], '"0 SQL"')
+        self.assertIn('miss', timings['cache']['desc'])
+        self.assertFalse(timings['cache']['desc'].startswith('"0 hit'))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        """Заголовок отключается настройкой."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_request_is_logged(self):
+        """Отобранный запрос пишется в журнал строкой JSON."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            self.client.get(url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], url)
+        self.assertEqual(record['view'], 'post:post_detail')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+
+    @override_settings(PERFORMANCE_SLOW_MS=0)
+    def test_slow_request_is_always_logged(self):
+        """Медленный запрос попадает в журнал независимо от выборки."""
+        with self.assertLogs('core.performance', 'INFO'):
+            self.client.get(reverse('about:author'))
+
+    def test_unsampled_request_is_not_logged(self):
+        """Без выборки и быстрые запросы журнал не пишется."""
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.performance', 'INFO'):
+                self.client.get(reverse('about:author'))
@@ -0,0 +1,203 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from about import urls as about_urls
+from core.query_budget import (
+    QueryBudgetExceeded,
+    QueryBudgetMixin,
+    query_budget,
+)
+from posts import counters, thumbnails
+from posts import urls as posts_urls
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import SMALL_GIF
+from posts.views import POSTS_PER_PAGE
+from users import urls as users_urls
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Наибольшее число SQL-запросов на страницу при пустом кэше
+BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 5,
+    'posts:profile': 5,
+    'posts:post_detail': 4,
+    'posts:post_edit': 4,
+    'posts:post_create': 3,
+    'posts:post_comments': 3,
+    'posts:add_comment': 2,
+    'posts:follow_index': 5,
+    'posts:search': 2,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 7,
+    'users:logout': 4,
+    'users:signup': 2,
+    'users:login': 2,
+    'users:password_change_form': 2,
+    'users:password_change_done': 2,
+    'users:password_reset_form': 2,
+    'users:password_reset_done': 2,
+    'users:password_reset_confirm': 5,
+    'users:password_reset_complete': 2,
+    'about:author': 2,
+    'about:tech': 2,
+}
+
+# Бюджеты отправки форм
+POST_BUDGETS = {
+    'posts:post_edit': 10,
+    'posts:post_create': 8,
+    'posts:add_comment': 5,
+    'users:signup': 2,
+    'users:login': 6,
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            username='reader', password='password'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        # Больше страницы постов от разных авторов, в разных группах, с
+        # картинками и комментариями: запрос на пост сразу выйдет за бюджет
+        for number in range(POSTS_PER_PAGE * 2):
+            author = User.objects.create_user(username=f'author{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}'
+            )
+            post = Post.objects.create(
+                author=author,
+                group=group if number % 2 else cls.group,
+                text=f'Тестовый пост {number}',
+                image=SimpleUploadedFile(
+                    f'small{number}.gif', SMALL_GIF, content_type='image/gif'
+                ) if number % 3 == 0 else None,
+            )
+            # Превью создаёт конвейер загрузки, страницы их только читают
+            thumbnails.pregenerate(post.pk)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий'
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            if number == 0:
+                cls.image_post = post
+        cls.author = author
+        cls.post = Post.objects.create(
+            author=cls.reader, group=cls.group, text='Свой пост'
+        )
+        # Строки счётчиков пользователей уже созданы, как на живом сайте
+        counters.reconcile()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Бюджет задан для худшего случая — пустого кэша
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def url(self, name):
+        kwargs = {
+            'posts:group_list': {'slug': self.group.slug},
+            'posts:profile': {'username': self.author.username},
+            'posts:post_detail': {'post_id': self.post.pk},
+            'posts:post_edit': {'post_id': self.post.pk},
+            'posts:post_comments': {'post_id': self.post.pk},
+            'posts:add_comment': {'post_id': self.post.pk},
+            'posts:profile_follow': {'username': self.author.username},
+            'posts:profile_unfollow': {'username': self.author.username},
+            'users:password_reset_confirm': {
+                'uidb64': urlsafe_base64_encode(force_bytes(self.reader.pk)),
+                'token': default_token_generator.make_token(self.reader),
+            },
+        }.get(name, {})
+        return reverse(name, kwargs=kwargs)
+
+    def test_budgets_cover_all_routes(self):
+        """Бюджет задан для каждого адреса posts, users и about."""
+        for urls in (posts_urls, users_urls, about_urls):
+            for pattern in urls.urlpatterns:
+                if isinstance(pattern, URLPattern):
+                    name = f'{urls.app_name}:{pattern.name}'
+                    with self.subTest(name=name):
+                        self.assertIn(name, BUDGETS)
+
+    def test_get_budgets(self):
+        """GET каждой страницы укладывается в бюджет запросов."""
+        for name, queries in BUDGETS.items():
+            with self.subTest(name=name):
+                cache.clear()
+                # Выход из аккаунта завершает сессию клиента
+                self.client.force_login(self.reader)
+                self.assertQueryBudget(self.url(name), queries)
+
+    def test_guest_budgets(self):
+        """Страницы для гостя укладываются в бюджет при пустом кэше."""
+        guest = Client()
+        for name in (
+            'posts:index', 'posts:group_list', 'posts:profile',
+            'posts:post_detail', 'posts:post_comments', 'posts:search',
+        ):
+            with self.subTest(name=name):
+                self.assertQueryBudget(
+                    self.url(name), BUDGETS[name], client=guest
+                )
+
+    def test_post_budgets(self):
+        """Отправка форм укладывается в бюджет запросов."""
+        data = {
+            'posts:post_edit': {'text': 'Изменённый пост'},
+            'posts:post_create': {'text': 'Новый пост'},
+            'posts:add_comment': {'text': 'Новый комментарий'},
+            'users:signup': {
+                'username': 'newcomer',
+                'password1': 'Sup3r-secret-pass',
+                'password2': 'Sup3r-secret-pass',
+            },
+            'users:login': {'username': 'reader', 'password': 'password'},
+        }
+        for name, queries in POST_BUDGETS.items():
+            with self.subTest(name=name):
+                cache.clear()
+                self.assertQueryBudget(
+                    self.url(name), queries, method='post', data=data[name]
+                )
+
+    def test_page_size_does_not_change_query_count(self):
+        """Число запросов ленты не растёт с числом постов на странице."""
+        def queries():
+            cache.clear()
+            with query_budget(BUDGETS['posts:index']) as captured:
+                self.client.get(reverse('posts:index'))
+            return len(captured)
+
+        full_page = queries()
+        # Два поста, один из них с картинкой
+        Post.objects.exclude(
+            pk__in=[self.post.pk, self.image_post.pk]
+        ).delete()
+        self.assertEqual(queries(), full_page)
+
+    def test_exceeded_budget_lists_queries(self):
+        """Превышение бюджета перечисляет выполненные запросы."""
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(0, label='проверка'):
+                list(Post.objects.all())
+        message = str(raised.exception)
+        self.assertIn('проверка: 1 SQL-запросов при бюджете 0', message)
+        self.assertIn('FROM "posts_post"', message)
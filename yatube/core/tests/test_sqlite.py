@@ -0,0 +1,73 @@
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.sqlite import apply_pragmas
+
+
+class SQLitePragmasTest(TestCase):
+    def connect(self, pragmas):
+        """Новое соединение Django с SQLITE_PRAGMAS = pragmas."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        default = connections[DEFAULT_DB_ALIAS]
+        wrapper = type(default)({
+            **default.settings_dict,
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+        }, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_connection_uses_production_pragmas(self):
+        """Соединение Django получает прагмы из SQLITE_PRAGMAS."""
+        wrapper = self.connect(settings.SQLITE_PRODUCTION_PRAGMAS)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+        # 1 — NORMAL
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+
+    def test_default_profile_keeps_sqlite_defaults(self):
+        """Без рабочего профиля прагмы SQLite не меняются."""
+        wrapper = self.connect({})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        # 2 — FULL
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 2)
+
+    def test_file_database_switches_to_wal(self):
+        """Файл базы переводится в режим WAL."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            db = sqlite3.connect(path)
+            apply_pragmas(db, settings.SQLITE_PRODUCTION_PRAGMAS)
+            db.close()
+            db = sqlite3.connect(path)
+            self.assertEqual(
+                db.execute('PRAGMA journal_mode').fetchone()[0], 'wal'
+            )
+            db.close()
+
+
+class BenchSQLiteTest(SimpleTestCase):
+    def test_benchmark_reports_both_profiles(self):
+        """Замер сравнивает настройки по умолчанию и рабочий профиль."""
+        stdout = io.StringIO()
+        call_command(
+            'bench_sqlite', readers=1, writers=1, seconds=0.2, rows=200,
+            stdout=stdout,
+        )
+        output = stdout.getvalue()
+        self.assertIn('по умолчанию', output)
+        self.assertIn('рабочий профиль', output)
+        self.assertEqual(output.count('оп/с'), 4)
@@ -0,0 +1,110 @@
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from core.writes import on_rollback, write_view
+
+
+class FlakyView:
+    """Представление, которому первые failures раз база занята."""
+
+    def __init__(self, failures, message='database is locked'):
+        self.failures = failures
+        self.message = message
+        self.calls = []
+        self.rolled_back = []
+
+    def __call__(self, request):
+        self.calls.append(connection.in_atomic_block)
+        on_rollback(lambda: self.rolled_back.append(len(self.calls)))
+        if len(self.calls) <= self.failures:
+            raise OperationalError(self.message)
+        return HttpResponse('ok')
+
+
+@override_settings(WRITE_RETRIES=3, WRITE_RETRY_DELAY=0)
+@mock.patch('core.writes.metrics.DB_WRITE_RETRIES')
+class WriteViewTest(TransactionTestCase):
+    def test_retries_locked_database(self, retries):
+        """Занятая база: транзакция повторяется, запрос успешен."""
+        view = FlakyView(failures=2)
+        response = write_view()(view)(RequestFactory().post('/'))
+        self.assertEqual(response.content, b'ok')
+        # Каждая попытка — в своей транзакции
+        self.assertEqual(view.calls, [True, True, True])
+
+    def test_failed_attempts_rolled_back(self, retries):
+        """Отмены вызываются только для откатившихся попыток."""
+        view = FlakyView(failures=2)
+        write_view()(view)(RequestFactory().post('/'))
+        self.assertEqual(view.rolled_back, [1, 2])
+
+    def test_retry_counted(self, retries):
+        """Повторы попадают в метрику."""
+        write_view()(FlakyView(failures=2))(RequestFactory().post('/'))
+        self.assertEqual(retries.inc.call_count, 2)
+
+    def test_gives_up_after_retries(self, retries):
+        """После WRITE_RETRIES повторов ошибка уходит дальше."""
+        view = FlakyView(failures=10)
+        with self.assertRaises(OperationalError):
+            write_view()(view)(RequestFactory().post('/'))
+        self.assertEqual(len(view.calls), 4)
+
+    def test_other_errors_not_retried(self, retries):
+        """Другие ошибки базы не повторяются."""
+        view = FlakyView(failures=1, message='no such table: posts_post')
+        with self.assertRaises(OperationalError):
+            write_view()(view)(RequestFactory().post('/'))
+        self.assertEqual(len(view.calls), 1)
+
+    def test_reading_methods_without_transaction(self, retries):
+        """Методы, при которых представление не пишет, идут как есть."""
+        view = FlakyView(failures=0)
+        write_view(methods=('POST',))(view)(RequestFactory().get('/'))
+        self.assertEqual(view.calls, [False])
+
+    @override_settings(WRITE_COORDINATION=False)
+    def test_disabled(self, retries):
+        """WRITE_COORDINATION = False выключает очередь и повторы."""
+        view = FlakyView(failures=1)
+        with self.assertRaises(OperationalError):
+            write_view()(view)(RequestFactory().post('/'))
+        self.assertEqual(view.calls, [False])
+
+    def test_transaction_takes_write_lock(self, retries):
+        """Транзакция сразу берёт блокировку записи."""
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                pass
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+class StressWritesTest(SimpleTestCase):
+    def test_no_lock_errors_under_concurrent_writes(self):
+        """Одновременные записи из нескольких процессов проходят без
+        ошибок «database is locked»."""
+        # Отдельный процесс: команда подменяет основную базу, а тестовая
+        # база в памяти живёт, пока открыто её соединение
+        result = subprocess.run(
+            [
+                sys.executable, 'manage.py', 'stress_writes',
+                '--processes', '4', '--threads', '2', '--requests', '10',
+            ],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('успешных запросов: 80 ', result.stdout)
+        self.assertIn('ошибок блокировки: 0\n', result.stdout)
+        self.assertIn('других ошибок: 0\n', result.stdout)
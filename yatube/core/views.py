@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from core import metrics as site_metrics
 
 
 def page_not_found(request, exception):
@@ -9,3 +14,22 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request) -> bool:
+    token = settings.METRICS_TOKEN
+    if token:
+        return constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+        )
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики всех процессов хоста для Prometheus."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        site_metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
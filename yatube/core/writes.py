@@ -0,0 +1,111 @@
+"""Запись в базу из представлений без ошибок «database is locked».
+
+SQLite пропускает одного писателя за раз. write_view выполняет
+представление целиком в одной транзакции, которая сразу берёт
+блокировку записи (core.backends.sqlite3) и ждёт её до busy_timeout.
+Потоки одного процесса встают в очередь на блокировке процесса и не
+соревнуются за файл базы между собой. Если базу всё же не дождались,
+транзакция откатывается и представление выполняется заново через
+случайную, растущую с каждой попыткой паузу — до WRITE_RETRIES раз.
+Откат не трогает то, что попытка записала мимо базы (например, файлы
+загрузок): такие изменения отменяются функциями on_rollback.
+
+WRITE_COORDINATION = False выключает всё это (для сравнения в
+stress_writes).
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Очередь писателей процесса
+_lock = threading.Lock()
+# Отмены изменений текущей попытки, None — вне write_view
+_rollbacks = ContextVar('write_rollbacks', default=None)
+
+
+def is_locked(error: Exception) -> bool:
+    """Ошибка SQLite «база занята», после которой запись можно повторить."""
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def backoff(attempt: int) -> float:
+    """Пауза перед повтором: случайная, до WRITE_RETRY_DELAY * 2^attempt."""
+    return random.uniform(0, settings.WRITE_RETRY_DELAY * 2 ** attempt)
+
+
+def on_rollback(func) -> None:
+    """Вызывает func, если транзакция write_view откатится."""
+    callbacks = _rollbacks.get()
+    if callbacks is not None:
+        callbacks.append(func)
+
+
+def _attempt(view, request, *args, **kwargs):
+    callbacks = []
+    token = _rollbacks.set(callbacks)
+    try:
+        with _lock, transaction.atomic():
+            return view(request, *args, **kwargs)
+    except BaseException:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception('Не удалось отменить изменения попытки')
+        raise
+    finally:
+        _rollbacks.reset(token)
+
+
+def _run(view, request, *args, **kwargs):
+    for attempt in range(settings.WRITE_RETRIES + 1):
+        try:
+            return _attempt(view, request, *args, **kwargs)
+        except OperationalError as error:
+            if not is_locked(error) or attempt == settings.WRITE_RETRIES:
+                raise
+        match = request.resolver_match
+        metrics.DB_WRITE_RETRIES.inc(
+            view=match.view_name if match else 'unresolved'
+        )
+        logger.info(
+            '%s %s: база занята, попытка %d', request.method,
+            request.path, attempt + 2,
+        )
+        time.sleep(backoff(attempt))
+        # Прошлая попытка дочитала загруженные файлы до конца
+        for _, uploads in request.FILES.lists():
+            for upload in uploads:
+                upload.seek(0)
+
+
+def write_view(methods=None):
+    """Декоратор представления, которое пишет в базу.
+
+    methods — методы запроса, при которых представление пишет; при
+    остальных оно выполняется как обычно. None — при любых.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not settings.WRITE_COORDINATION
+                or (methods is not None and request.method not in methods)
+                # Внутри чужой транзакции повтор ничего не исправит
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            ):
+                return view(request, *args, **kwargs)
+            return _run(view, request, *args, **kwargs)
+        return wrapper
+    return decorator
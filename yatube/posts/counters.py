@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _count(queryset, field: str):
+    """Подзапрос COUNT(*) по связи field = OuterRef('pk')."""
+    counted = queryset.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(
+        Subquery(counted.values('total'), output_field=IntegerField()), 0
+    )
+
+
+def count_user(user_id: int) -> UserStats:
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id
+            ).count(),
+        }
+    )
+    return stats
+
+
+def user_stats(user: User) -> UserStats:
+    try:
+        return user.stats  # type: ignore
+    except UserStats.DoesNotExist:
+        return count_user(user.pk)
+
+
+def group_posts_count(group: Group) -> int:
+    if group.posts_count is None:
+        group.posts_count = group.posts.count()  # type: ignore
+        Group.objects.filter(pk=group.pk).update(
+            posts_count=group.posts_count
+        )
+    return group.posts_count
+
+
+def bump_user(user_id: int, field: str, delta: int) -> None:
+    # Нет записи — нечего обновлять, она будет подсчитана при чтении
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def bump_group(group_id, delta: int) -> None:
+    # NULL + delta остаётся NULL: неподсчитанная группа так и ждёт чтения
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def bump_comments(post_id: int, delta: int) -> None:
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+@transaction.atomic
+def reconcile() -> None:
+    """Пересчитывает все счётчики по исходным таблицам.
+
+    Одной транзакцией: между удалением и вставкой UserStats конкурентные
+    bump_user и count_user ждут блокировку, а не теряют изменения.
+    """
+    Post.objects.update(comments_count=_count(Comment.objects, 'post'))
+    Group.objects.update(posts_count=_count(Post.objects, 'group'))
+    UserStats.objects.all().delete()
+    stats = User.objects.annotate(
+        total_posts=_count(Post.objects, 'author'),
+        total_followers=_count(Follow.objects, 'author'),
+        total_following=_count(Follow.objects, 'user'),
+    ).values_list('pk', 'total_posts', 'total_followers', 'total_following')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=pk,
+                posts_count=posts,
+                followers_count=followers,
+                following_count=following,
+            )
+            for pk, posts, followers, following in stats.iterator()
+        ),
+        batch_size=500,
+    )
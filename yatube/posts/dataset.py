@@ -0,0 +1,200 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Пользователи, группы, посты с картинками, комментарии и граф подписок
+создаются пачками через bulk_create. Популярность авторов распределена
+по степенному закону: немногие авторы пишут большую часть постов и
+собирают большую часть подписок, немногие посты — большую часть
+комментариев, как в настоящих соцсетях.
+"""
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts.jsonl import rebuild_derived_data, stored_dates
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+# Показатель степенного закона популярности авторов
+POPULARITY_EXPONENT = 1.2
+# Картинки повторяются: уникальные файлы не нужны для замеров
+IMAGE_POOL_SIZE = 20
+PASSWORD = 'benchmark'
+
+
+def _batched(objects, size=BATCH_SIZE):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _bulk_create(model, objects) -> list:
+    created = []
+    for batch in _batched(objects):
+        created += model.objects.bulk_create(batch)
+    return created
+
+
+def _popularity(count: int, rng=None) -> list:
+    """Накопленные веса степенного закона для random.choices.
+
+    С cum_weights выбор стоит O(log n), а не O(n) на каждый вызов. С
+    rng популярные записи разбросаны случайно, а не идут первыми.
+    """
+    weights = [
+        1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(count)
+    ]
+    if rng is not None:
+        rng.shuffle(weights)
+    return list(accumulate(weights))
+
+
+def _images(fake, rng) -> list:
+    names = []
+    for number in range(IMAGE_POOL_SIZE):
+        buffer = io.BytesIO()
+        Image.new(
+            'RGB',
+            (rng.randint(800, 1600), rng.randint(400, 1200)),
+            fake.color(),
+        ).save(buffer, 'JPEG', quality=80)
+        names.append(default_storage.save(
+            f'posts/dataset_{number}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def _last_pk(model) -> int:
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def generate(users=100, groups=10, posts=1000, comments=3000,
+             follows=20, image_ratio=0.2, days=365, seed=0) -> dict:
+    """Создаёт набор данных и возвращает число созданных записей.
+
+    follows — среднее число подписок на пользователя. Даты публикации
+    равномерно распределены по последним days дням.
+    """
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    def make_post(user_ids, activity, group_ids, images):
+        pub_date = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        return Post(
+            author_id=rng.choices(user_ids, cum_weights=activity)[0],
+            group_id=rng.choice(group_ids + [None]) if group_ids else None,
+            text=fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            image=rng.choice(images) if rng.random() < image_ratio else '',
+            pub_date=pub_date,
+            updated=pub_date,
+        )
+
+    def make_comment(user_ids, posts, weights):
+        post_id, pub_date = rng.choices(posts, cum_weights=weights)[0]
+        # Комментарии появляются в первые дни после публикации
+        created = pub_date + timedelta(hours=rng.expovariate(1 / 24))
+        return Comment(
+            post_id=post_id,
+            author_id=rng.choice(user_ids),
+            text=fake.sentence(),
+            created=min(created, now),
+        )
+
+    with transaction.atomic(), stored_dates([Post, Comment]):
+        last_user = _last_pk(User)
+        _bulk_create(User, (
+            User(
+                username=f'user{last_user + number + 1}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                email=fake.email(),
+                password=password,
+            )
+            for number in range(users)
+        ))
+        # bulk_create в SQLite не возвращает id, новые записи — после
+        # последнего существовавшего id
+        user_ids = list(User.objects.filter(
+            pk__gt=last_user
+        ).values_list('pk', flat=True))
+        weights = _popularity(len(user_ids))
+
+        last_group = _last_pk(Group)
+        _bulk_create(Group, (
+            Group(
+                title=fake.sentence(nb_words=3)[:200],
+                slug=f'group-{last_group + number + 1}',
+                description=fake.paragraph(),
+            )
+            for number in range(groups)
+        ))
+        group_ids = list(Group.objects.filter(
+            pk__gt=last_group
+        ).values_list('pk', flat=True))
+
+        last_post = _last_pk(Post)
+        images = _images(fake, rng) if image_ratio and posts else []
+        # Активность авторов не связана с их популярностью, иначе ленты
+        # подписчиков самых популярных авторов росли бы квадратично
+        activity = _popularity(len(user_ids), rng)
+        if user_ids:
+            _bulk_create(Post, (
+                make_post(user_ids, activity, group_ids, images)
+                for _ in range(posts)
+            ))
+        post_dates = list(Post.objects.filter(
+            pk__gt=last_post
+        ).values_list('pk', 'pub_date'))
+
+        comment_count = 0
+        if post_dates:
+            # Комментарии тоже собирают немногие популярные посты
+            post_weights = _popularity(len(post_dates), rng)
+            comment_count = len(_bulk_create(Comment, (
+                make_comment(user_ids, post_dates, post_weights)
+                for _ in range(comments)
+            )))
+
+        pairs = set()
+        for user_id in user_ids:
+            count = int(rng.expovariate(1 / follows)) if follows else 0
+            # Повторные выборы популярных авторов отбрасываются, поэтому
+            # попыток больше, чем нужно подписок, но не бесконечно
+            authors = {
+                author_id for author_id in rng.choices(
+                    user_ids, cum_weights=weights, k=count * 3
+                )
+                if author_id != user_id
+            }
+            authors = set(islice(authors, count))
+            pairs.update((user_id, author_id) for author_id in authors)
+        _bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ))
+
+        rebuild_derived_data()
+
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_dates),
+        'comments': comment_count,
+        'follows': len(pairs),
+    }
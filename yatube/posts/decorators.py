@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from posts import generations
+
+
+def generation_response(request, scopes, respond, key_prefix='page'):
+    """Ответ, закэшированный до смены поколения областей scopes.
+
+    Поколение даёт ETag и Last-Modified: на условный GET отвечаем 304,
+    не вызывая respond(), а готовый ответ хранится в кэше под ключом из
+    поколения и полного пути запроса. Если ответ зависит не только от
+    пути, это нужно отразить в key_prefix.
+    """
+    version = generations.latest(scopes)
+    last_modified = version // 10 ** 9
+    etag = quote_etag(f'{version:x}')
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return response
+
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = f'{key_prefix}:{version}:{path}'
+    response = cache.get(key)
+    if response is None:
+        response = respond()
+        if response.status_code != 200 or response.cookies:
+            return response
+        cache.set(key, response, generations.timeout(version))
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def anonymous_page_cache(get_scopes):
+    """Кэш целых страниц для анонимных читателей.
+
+    get_scopes(**kwargs) возвращает области, от которых зависит страница,
+    или None, если страницу кэшировать не нужно.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+
+            scopes = get_scopes(**kwargs)
+            if not scopes:
+                return view(request, *args, **kwargs)
+
+            response = generation_response(
+                request, scopes, lambda: view(request, *args, **kwargs)
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+
+        return wrapper
+
+    return decorator
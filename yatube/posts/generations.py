@@ -0,0 +1,94 @@
+"""Поколения кэша: ключ фрагмента включает поколение его области.
+
+При изменении данных поколение сменяется, старые записи перестают
+читаться, поэтому сами фрагменты хранятся бессрочно. Поколение — время
+последнего изменения в наносекундах, оно же служит Last-Modified.
+
+Исключение — первые REPLICA_STICKY_SECONDS после смены поколения:
+отставшая реплика ещё может отдать данные до записи, и отрисованное по
+ним живёт в кэше только до конца этого окна (см. timeout).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from posts.models import Follow, Group
+
+INDEX = 'index'
+GROUPS = 'groups'
+# Число комментариев в списках постов API: HTML-списки его не показывают,
+# поэтому комментарий не сбрасывает их кэш
+COMMENTS = 'comments'
+
+
+def group_scope(slug: str) -> str:
+    return f'group:{slug}'
+
+
+def author_scope(username: str) -> str:
+    return f'author:{username}'
+
+
+def feed_scope(user_id) -> str:
+    return f'feed:{user_id}'
+
+
+def post_scope(post_id) -> str:
+    return f'post:{post_id}'
+
+
+def _key(scope: str) -> str:
+    return f'generation:{scope}'
+
+
+def generation(scope: str) -> int:
+    key = _key(scope)
+    value = cache.get(key)
+    if value is None:
+        # Поколение неизвестно — считаем, что данные изменились сейчас
+        value = time.time_ns()
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+    return value
+
+
+def latest(scopes) -> int:
+    """Последнее из поколений нескольких областей."""
+    return max(generation(scope) for scope in scopes)
+
+
+def timeout(version: int):
+    """Срок записи кэша под поколением version: None — бессрочно."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    age = time.time_ns() - version
+    if age >= settings.REPLICA_STICKY_SECONDS * 10 ** 9:
+        return None
+    return settings.REPLICA_STICKY_SECONDS
+
+
+def bump(*scopes) -> None:
+    now = time.time_ns()
+    cache.set_many({_key(scope): now for scope in scopes}, None)
+
+
+def invalidate_post(post, *group_ids) -> None:
+    """Сбрасывает все списки и страницы, где видна карточка поста."""
+    # Список от fan_out годится только для этого сохранения
+    followers = vars(post).pop('_followers', None)
+    if followers is None:
+        followers = Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    group_ids = [group_id for group_id in group_ids if group_id is not None]
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ) if group_ids else []
+    bump(
+        INDEX,
+        author_scope(post.author.username),
+        post_scope(post.pk),
+        *(group_scope(slug) for slug in slugs),
+        *(feed_scope(user_id) for user_id in followers),
+    )
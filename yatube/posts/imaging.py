@@ -0,0 +1,73 @@
+"""Обработка загруженных картинок в отдельном процессе.
+
+Модуль не импортирует Django: его функции выполняются в процессах
+пула, запущенных методом spawn, где настройки проекта не загружены.
+"""
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+# Параметры сохранения для форматов, которые пересжимаются
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'method': 6},
+}
+LOSSY_FORMATS = ('JPEG', 'WEBP')
+
+
+def _metadata(path: str, image: Image.Image, image_format: str) -> dict:
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_format': image_format,
+        'image_bytes': os.path.getsize(path),
+    }
+
+
+def _save_atomic(image: Image.Image, path: str, image_format: str,
+                 options: dict) -> None:
+    # Пишем рядом и подменяем файл, чтобы читатели не видели его
+    # наполовину записанным
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            image.save(temp_file, image_format, **options)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def process_image(path: str, max_size: tuple, quality: int) -> dict:
+    """Приводит оригинал к разумному виду и возвращает его метаданные.
+
+    Картинка поворачивается по EXIF, уменьшается до max_size, EXIF и
+    прочие метаданные отбрасываются. Формат файла сохраняется, чтобы не
+    менять его имя; анимированные картинки не трогаем.
+    """
+    with Image.open(path) as image:
+        image_format = image.format
+        icc_profile = image.info.get('icc_profile')
+        if (
+            getattr(image, 'is_animated', False)
+            or image_format not in SAVE_OPTIONS
+        ):
+            return _metadata(path, image, image_format)
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size, Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = dict(SAVE_OPTIONS[image_format])
+        if icc_profile:
+            # Цветовой профиль — не метаданные, без него исказятся цвета
+            options['icc_profile'] = icc_profile
+        if image_format in LOSSY_FORMATS:
+            options['quality'] = quality
+        _save_atomic(image, path, image_format, options)
+        return _metadata(path, image, image_format)
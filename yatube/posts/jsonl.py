@@ -0,0 +1,167 @@
+"""Потоковый перенос данных постов в формате JSON Lines.
+
+Каждая строка — одна запись: {"model": "posts.post", "fields": {...}}.
+Модели выгружаются в порядке зависимостей, первичные ключи и внешние
+ключи сохраняются как есть. В отличие от dumpdata/loaddata память не
+растёт с объёмом: выгрузка читает таблицы через iterator(), загрузка
+вставляет записи пачками через bulk_create.
+"""
+import datetime
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from posts import counters, search, timelines
+from posts.models import Comment, Follow, Group, Post, User
+
+# Порядок важен: модель идёт после всех, на кого ссылается
+MODELS = (User, Group, Post, Comment, Follow)
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+
+class _Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder округляет время до миллисекунд, а ключи
+        # курсорной пагинации должны совпадать точно
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _copy_image(name: str, media_dir: str) -> None:
+    target = os.path.join(media_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name) as source, open(target, 'wb') as copy:
+        shutil.copyfileobj(source, copy)
+
+
+def export(stream, media_dir=None, report=None) -> None:
+    """Пишет все записи в stream; картинки копируются в media_dir.
+
+    Все таблицы читаются из одного снимка базы: комментарии и подписки
+    выгрузки не ссылаются на посты и пользователей, которых в ней нет.
+    """
+    with connection.snapshot():
+        for model in MODELS:
+            started = time.perf_counter()
+            count = 0
+            label = model._meta.label_lower
+            rows = model.objects.order_by('pk').values(*_fields(model))
+            for row in rows.iterator(chunk_size=CHUNK_SIZE):
+                stream.write(json.dumps(
+                    {'model': label, 'fields': row},
+                    cls=_Encoder,
+                    ensure_ascii=False,
+                ))
+                stream.write('\n')
+                if media_dir and model is Post and row['image']:
+                    _copy_image(row['image'], media_dir)
+                count += 1
+            if report:
+                report(label, count, time.perf_counter() - started)
+
+
+@contextmanager
+def stored_dates(models):
+    """Даты auto_now/auto_now_add берутся из файла, а не из часов."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _restore_image(name: str, media_dir: str) -> None:
+    source = os.path.join(media_dir, name)
+    if default_storage.exists(name) or not os.path.exists(source):
+        return
+    with open(source, 'rb') as image:
+        default_storage.save(name, File(image))
+
+
+def rebuild_derived_data() -> None:
+    """bulk_create не вызывает сигналы: пересчитываем всё производное."""
+    timelines.rebuild()
+    counters.reconcile()
+    search.rebuild()
+    # Поколения кэша не знают о загруженных записях
+    cache.clear()
+
+
+def _records(stream, media_dir):
+    models = {model._meta.label_lower: model for model in MODELS}
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        model = models[record['model']]
+        obj = model(**record['fields'])
+        if media_dir and model is Post and obj.image:
+            _restore_image(obj.image.name, media_dir)
+        yield model, obj
+
+
+def load(stream, media_dir=None, batch_size=BATCH_SIZE,
+         ignore_conflicts=False, report=None) -> None:
+    """Загружает записи из stream пачками по batch_size."""
+    loaded = []
+    with transaction.atomic(), stored_dates(MODELS):
+        records = _records(stream, media_dir)
+        for model, group in groupby(records, key=itemgetter(0)):
+            started = time.perf_counter()
+            count = 0
+            while True:
+                batch = [obj for _, obj in islice(group, batch_size)]
+                if not batch:
+                    break
+                model.objects.bulk_create(
+                    batch,
+                    # SQLite ограничивает число параметров и частей
+                    # UNION ALL в одном INSERT, явный batch_size Django
+                    # под них не подгоняет
+                    batch_size=min(batch_size, connection.ops.bulk_batch_size(
+                        model._meta.concrete_fields, batch
+                    )),
+                    ignore_conflicts=ignore_conflicts,
+                )
+                count += len(batch)
+            loaded.append(model)
+            if report:
+                report(
+                    model._meta.label_lower,
+                    count,
+                    time.perf_counter() - started,
+                )
+
+        # Явные первичные ключи не сдвигают последовательности в
+        # PostgreSQL и подобных базах
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), loaded
+            ):
+                cursor.execute(sql)
+        rebuild_derived_data()
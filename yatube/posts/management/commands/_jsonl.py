@@ -0,0 +1,42 @@
+import gzip
+import sys
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def open_stream(path: str, mode: str):
+    """Файл JSON Lines: '-' — stdin/stdout, *.gz сжимается gzip."""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+    elif path.endswith('.gz'):
+        with gzip.open(path, mode + 't', encoding='utf-8') as stream:
+            yield stream
+    else:
+        with open(path, mode, encoding='utf-8') as stream:
+            yield stream
+
+
+class ThroughputReport:
+    """Печатает скорость по моделям и итог в stderr команды."""
+
+    def __init__(self, command):
+        self.command = command
+        self.started = time.perf_counter()
+        self.total = 0
+
+    def __call__(self, label: str, count: int, seconds: float) -> None:
+        self.total += count
+        self.command.stderr.write(
+            f'{label:<16}{count:>12,} записей '
+            f'{count / max(seconds, 1e-9):>12,.0f} зап/с'
+        )
+
+    def finish(self) -> None:
+        seconds = time.perf_counter() - self.started
+        self.command.stderr.write(
+            self.command.style.SUCCESS(
+                f'Всего {self.total:,} записей за {seconds:.1f} с, '
+                f'{self.total / max(seconds, 1e-9):,.0f} зап/с'
+            )
+        )
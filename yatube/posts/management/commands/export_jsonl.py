@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import jsonl
+
+from ._jsonl import ThroughputReport, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в JSON Lines'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="Файл выгрузки, '-' — stdout, *.gz — со сжатием"
+        )
+        parser.add_argument(
+            '--media-dir', help='Куда скопировать картинки постов'
+        )
+
+    def handle(self, *args, **options):
+        report = ThroughputReport(self)
+        with open_stream(options['path'], 'w') as stream:
+            jsonl.export(stream, options['media_dir'], report)
+        report.finish()
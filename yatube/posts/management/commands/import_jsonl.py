@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import jsonl
+
+from ._jsonl import ThroughputReport, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_jsonl пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="Файл выгрузки, '-' — stdin, *.gz — со сжатием"
+        )
+        parser.add_argument(
+            '--media-dir', help='Откуда взять картинки постов'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=jsonl.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать записи, которые уже есть в базе'
+        )
+
+    def handle(self, *args, **options):
+        report = ThroughputReport(self)
+        with open_stream(options['path'], 'r') as stream:
+            jsonl.load(
+                stream,
+                media_dir=options['media_dir'],
+                batch_size=options['batch_size'],
+                ignore_conflicts=options['ignore_conflicts'],
+                report=report,
+            )
+        report.finish()
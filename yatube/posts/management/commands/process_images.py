@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import uploads
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает картинки постов, загруженные до появления конвейера'
+
+    def handle(self, *args, **options):
+        post_ids = list(
+            Post.objects.exclude(image='').filter(
+                image_width__isnull=True
+            ).values_list('id', flat=True).iterator()
+        )
+        for post_id in post_ids:
+            uploads.ingest(post_id)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {len(post_ids)}')
+        )
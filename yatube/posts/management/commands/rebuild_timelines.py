@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из таблицы Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=options['usernames']
+                ).values_list('id', flat=True)
+            )
+        count = timelines.rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано подписок: {count}')
+        )
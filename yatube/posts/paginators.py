@@ -0,0 +1,113 @@
+import base64
+import binascii
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Направления курсора: к более старым и к более новым постам
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(obj, direction: str, date_field: str = 'pub_date',
+                  key_field: str = 'pk') -> str:
+    date = getattr(obj, date_field).isoformat()
+    raw = f'{direction}|{date}|{getattr(obj, key_field)}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, date, pk = raw.split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidPage('Некорректный курсор')
+
+    if direction not in (NEXT, PREVIOUS) or date is None:
+        raise InvalidPage('Некорректный курсор')
+
+    return direction, date, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (date_field, key_field), от новых записей к
+    старым.
+
+    Стоимость запроса не зависит от глубины страницы: вместо OFFSET
+    используется условие по ключу последней показанной записи.
+
+    Страницы — обычные Page с атрибутами is_cursor, cursor, next_cursor,
+    previous_cursor и cache_key. Всего записей паджинатор не знает: номер
+    страницы и число страниц условные (до и после текущей — ещё по
+    странице, если туда есть курсор), поэтому has_next() и has_previous()
+    обходятся без COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 key_field='pk', **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.date_field = date_field
+        self.key_field = key_field
+
+    def get_page(self, cursor):
+        try:
+            return self.page(cursor)
+        except InvalidPage:
+            return self.page(None)
+
+    def page(self, cursor):
+        field, key = self.date_field, self.key_field
+        objects = self.object_list
+        newest_first = (f'-{field}', f'-{key}')
+        if not cursor:
+            rows = list(objects.order_by(*newest_first)[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            direction, date, pk = decode_cursor(cursor)
+            if direction == NEXT:
+                # Граница по дате отдельным условием: по ней SQLite ищет
+                # в индексе, а не просматривает его с начала
+                rows = list(
+                    objects.filter(**{f'{field}__lte': date}).filter(
+                        Q(**{f'{field}__lt': date})
+                        | Q(**{field: date, f'{key}__lt': pk})
+                    ).order_by(*newest_first)[:self.per_page + 1]
+                )
+                has_next, has_previous = len(rows) > self.per_page, True
+                rows = rows[:self.per_page]
+            else:
+                rows = list(
+                    objects.filter(**{f'{field}__gte': date}).filter(
+                        Q(**{f'{field}__gt': date})
+                        | Q(**{field: date, f'{key}__gt': pk})
+                    ).order_by(field, key)[:self.per_page + 1]
+                )
+                has_next, has_previous = True, len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+
+        number = 2 if has_previous else 1
+        self.num_pages = number + has_next
+        self.count = (self.num_pages - 1) * self.per_page + len(rows)
+        page = Page(rows, number, self)
+        page.is_cursor = True
+        page.cursor = cursor
+        # Ключ кэша по записям страницы, а не по курсору из адреса: разные
+        # курсоры на те же записи дают один ключ, выдуманные не плодят новых
+        page.cache_key = (
+            f'{getattr(rows[0], key)}-{getattr(rows[-1], key)}'
+            if rows else 'empty'
+        )
+        page.next_cursor = (
+            encode_cursor(rows[-1], NEXT, field, key)
+            if rows and has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], PREVIOUS, field, key)
+            if rows and has_previous else None
+        )
+        return page
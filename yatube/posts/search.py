@@ -0,0 +1,131 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс — отдельная таблица FTS5 с rowid, равным id поста. Её
+обновляют сигналы сохранения и удаления поста; после массовых операций
+в обход сигналов индекс пересобирается командой rebuild_search_index.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.models import Post
+
+TABLE = 'posts_post_fts'
+
+# Служебные символы выделения в snippet(): их не бывает в тексте,
+# поэтому после экранирования их можно заменить на теги
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 24
+
+WORD = re.compile(r'\w+')
+
+
+def to_match(query: str) -> str:
+    """Запрос пользователя в синтаксисе MATCH: все слова, по префиксу.
+
+    Операторы FTS5 из ввода не принимаются — каждое слово берётся в
+    кавычки, поэтому запрос никогда не бывает синтаксически неверным.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def index(post: Post) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def remove(post_id: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild() -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) SELECT id, text FROM '
+            f'{Post._meta.db_table}'
+        )
+        return cursor.rowcount
+
+
+def matching(match: str) -> RawSQL:
+    """Подзапрос id подходящих постов для filter(pk__in=...)."""
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+                  [match])
+
+
+def _highlight(snippet: str) -> str:
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Результаты поиска по релевантности (bm25) для Paginator.
+
+    Срез читает из индекса только id и фрагменты своей страницы, сами
+    посты догружаются одним запросом.
+    """
+
+    def __init__(self, query: str):
+        self.match = to_match(query)
+        self._count = None
+
+    @staticmethod
+    def _cursor():
+        # Индекс читается из той же базы, что и сами посты
+        return connections[router.db_for_read(Post)].cursor()
+
+    def count(self) -> int:
+        if not self.match:
+            return 0
+        if self._count is None:
+            with self._cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                    [self.match],
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if not self.match:
+            return []
+        start = item.start or 0
+        with self._cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [
+                    MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+                    self.match, item.stop - start, start,
+                ],
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.for_listing().in_bulk(
+            [post_id for post_id, _ in rows]
+        )
+        results = []
+        for post_id, snippet in rows:
+            post = posts.get(post_id)
+            if post is not None:
+                post.snippet = _highlight(snippet)
+                results.append(post)
+        return results
@@ -0,0 +1,138 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import writes
+from posts import counters, generations, search, timelines, uploads
+from posts.models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        # Подписчики нужны и для сброса кэша их лент
+        instance._followers = timelines.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_prune(sender, instance, **kwargs):
+    timelines.prune(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_state(sender, instance, **kwargs):
+    instance._old_group_id, instance._old_image = (
+        Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if instance.pk else None
+    ) or (None, None)
+    if instance.image and not instance.image._committed:
+        # Файл загрузки сохраняется мимо транзакции
+        writes.on_rollback(lambda: uploads.discard(instance))
+
+
+@receiver(post_save, sender=Post)
+def post_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump_group(instance.group_id, 1)
+    elif instance._old_group_id != instance.group_id:
+        counters.bump_group(instance._old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def post_image(sender, instance, created, **kwargs):
+    if instance.image.name == (instance._old_image or ''):
+        return
+    if instance.image:
+        uploads.schedule(instance)
+    else:
+        uploads.clear_metadata(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncount(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_index(sender, instance, **kwargs):
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex(sender, instance, **kwargs):
+    search.remove(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncount(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncount(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def post_invalidate(sender, instance, created, **kwargs):
+    generations.invalidate_post(
+        instance,
+        instance.group_id,
+        None if created else instance._old_group_id,
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_delete_invalidate(sender, instance, **kwargs):
+    generations.invalidate_post(instance, instance.group_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate(sender, instance, **kwargs):
+    generations.bump(
+        generations.GROUPS, generations.group_scope(instance.slug)
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_invalidate(sender, instance, **kwargs):
+    generations.bump(
+        generations.post_scope(instance.post_id), generations.COMMENTS
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_invalidate(sender, instance, **kwargs):
+    # Счётчики подписок видны в профилях обоих пользователей
+    generations.bump(
+        generations.feed_scope(instance.user_id),
+        generations.author_scope(instance.user.username),
+        generations.author_scope(instance.author.username),
+    )
@@ -0,0 +1,107 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post) -> str:
+    """Ключ карточки: версия поста и показанные в ней автор и группа.
+
+    Переименование автора или смена адреса группы не трогают updated
+    поста, поэтому их значения тоже входят в ключ.
+    """
+    author = post.author
+    shown = '\0'.join((
+        author.username,
+        author.get_full_name(),
+        post.group.slug if post.group_id else '',
+    ))
+    stamp = hashlib.md5(shown.encode()).hexdigest()
+    return f'post_card:{post.pk}:{post.updated.timestamp()}:{stamp}'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Отрисованные карточки постов страницы, кэш читается одним get_many.
+
+    Разметка карточки одна для всех лент, поэтому пост, однажды
+    отрисованный на любой из них, дальше берётся из кэша.
+    """
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    missing = [
+        post for post, key in zip(posts, keys) if key not in cached
+    ]
+    # Варианты картинок всех недостающих карточек одним обращением к
+    # kvstore
+    thumbnails.prefetch(missing)
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(CARD_TEMPLATE, {'post': post})
+            rendered[key] = card
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, None)
+
+    return cards
+
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+}
+
+
+def _srcset(variants) -> str:
+    return ', '.join(
+        f'{thumbnail.url} {width}w' for width, thumbnail in variants
+    )
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """<picture> с вариантами картинки поста разных форматов и ширин.
+
+    Браузер сам выбирает формат из <source> и ширину по srcset/sizes,
+    старые браузеры получают самый широкий вариант запасного формата.
+    """
+    if post.image and not hasattr(post, 'image_variants'):
+        thumbnails.prefetch([post])
+    variants = getattr(post, 'image_variants', None)
+    if not variants:
+        return {}
+    *modern, fallback_format = [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in variants
+    ] or list(variants)
+    fallback = variants[fallback_format]
+    width, image = fallback[-1]
+    return {
+        'sources': [
+            {
+                'type': MIME_TYPES[image_format],
+                'srcset': _srcset(variants[image_format]),
+            }
+            for image_format in modern
+        ],
+        'srcset': _srcset(fallback),
+        'sizes': settings.POST_IMAGE_SIZES,
+        'image': image,
+        # Размер неизвестен, если превью не удалось создать
+        'size': image.size or None,
+    }
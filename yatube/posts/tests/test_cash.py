@@ -1,8 +1,11 @@
+from unittest import mock
+
 from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
-from posts.models import Post, User
+from posts.models import Group, Post, User
+from posts.templatetags import post_cards
 
 
 class CashTest(TestCase):
@@ -36,4 +39,64 @@ class CashTest(TestCase):
         response = self.client.get(reverse('posts:index'))
         posts_at_index_after = str(response.content).count('/posts/')
         self.assertEqual(posts_at_db_before, posts_at_db_after - 1)
-        self.assertEqual(posts_at_index_before, posts_at_index_after)
+        # Новый пост сбрасывает поколение кэша и сразу виден на главной
+        self.assertEqual(posts_at_index_before + 1, posts_at_index_after)
+
+    def test_cache_kept_until_data_changes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'user1'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                # Запись в обход сигналов не сбрасывает кэш
+                Post.objects.filter(pk=self.post.pk).update(text='скрыто')
+                response = self.client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+                Post.objects.filter(pk=self.post.pk).update(
+                    text='Тестовый пост'
+                )
+
+    def test_cache_dropped_on_post_edit(self):
+        url = reverse('posts:profile', kwargs={'username': 'user1'})
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Изменённый пост'
+        post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Изменённый пост')
+        post.text = 'Тестовый пост'
+        post.save()
+
+    def test_post_card_rendered_once_for_all_listings(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'user1'}),
+        )
+        with mock.patch.object(
+            post_cards,
+            'render_to_string',
+            wraps=post_cards.render_to_string
+        ) as render:
+            for url in urls:
+                response = self.client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+        self.assertEqual(render.call_count, 1)
+
+    def test_post_card_follows_author_and_group(self):
+        """Новое имя автора и адрес группы видны в карточке сразу."""
+        group = Group.objects.create(
+            title='Группа', slug='old', description='Описание'
+        )
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+
+        def card():
+            post = Post.objects.for_listing().get(pk=self.post.pk)
+            return post_cards.post_cards([post])[0]
+
+        self.assertIn('/group/old/', card())
+        User.objects.filter(pk=self.author.pk).update(first_name='Новое')
+        Group.objects.filter(pk=group.pk).update(slug='new')
+        self.assertIn('Новое', card())
+        self.assertIn('/group/new/', card())
@@ -1,8 +1,10 @@
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.test import TestCase
 from django.urls import reverse
 
 from posts.models import Comment, Post, User
+from posts.views import COMMENTS_PER_PAGE
 
 
 class CommentsTests(TestCase):
@@ -58,3 +60,54 @@ class CommentsTests(TestCase):
             id=id
         ).comments.all()[0].text  # type: ignore
         self.assertEqual(last_comment, text)
+
+    def test_post_detail_shows_first_page_of_comments(self):
+        """Страница поста показывает одну порцию комментариев."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'Коммент {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+        more_url = (
+            reverse('posts:post_comments', args=[self.post.pk])
+            + f'?cursor={comments.next_cursor}'
+        )
+        self.assertContains(response, more_url)
+
+        response = self.client.get(more_url)
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(rest.has_next())
+        self.assertNotContains(response, 'load-more')
+        shown = {comment.pk for comment in comments} | {
+            comment.pk for comment in rest
+        }
+        self.assertEqual(
+            shown,
+            set(self.post.comments.values_list('pk', flat=True))
+        )
+
+    def test_comments_page_cost_does_not_depend_on_volume(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'Коммент {i}')
+            for i in range(COMMENTS_PER_PAGE * 3)
+        )
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        self.client.logout()
+        cache.clear()
+        # Одна выборка: комментарии вместе с авторами
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'cursor': 'garbage'}
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,104 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.user = User.objects.create_user(username='user')  # type: ignore
+
+    def refresh(self):
+        self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.client.get(reverse('posts:group_list', args=[self.group.slug]))
+        self.client.get(reverse('posts:profile', args=[self.user.username]))
+
+    def assertCounters(self, posts, group_posts, followers):
+        author_stats = UserStats.objects.get(user=self.author)
+        user_stats = UserStats.objects.get(user=self.user)
+        self.group.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, posts)
+        self.assertEqual(author_stats.followers_count, followers)
+        self.assertEqual(user_stats.following_count, followers)
+        self.assertEqual(self.group.posts_count, group_posts)
+
+    def test_counters_follow_writes(self):
+        self.refresh()
+        post = Post.objects.create(
+            author=self.author, text='текст', group=self.group
+        )
+        Post.objects.create(author=self.author, text='текст')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertCounters(posts=2, group_posts=1, followers=1)
+
+        post.group = self.other_group
+        post.save()
+        follow.delete()
+        self.assertCounters(posts=2, group_posts=0, followers=0)
+
+        post.delete()
+        self.assertCounters(posts=1, group_posts=0, followers=0)
+
+    def test_comments_count_survives_stale_post_save(self):
+        post = Post.objects.create(author=self.author, text='текст')
+        Comment.objects.create(post=post, author=self.user, text='раз')
+        Comment.objects.create(post=post, author=self.user, text='два')
+        post.text = 'новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+
+    def test_profile_and_detail_use_counters(self):
+        post = Post.objects.create(author=self.author, text='текст')
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['stats'].posts_count, 1)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertEqual(response.context['count'], 1)
+
+    def test_reconcile_counters_command(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text='текст', group=self.group)
+            for _ in range(3)
+        ])
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.all().update(posts_count=100, followers_count=100)
+        Group.objects.update(posts_count=100)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(posts=3, group_posts=3, followers=1)
+
+    def test_reconcile_is_atomic(self):
+        """Сбой вставки не оставляет таблицу UserStats пустой."""
+        self.refresh()
+        stats = UserStats.objects.count()
+        with mock.patch.object(
+            UserStats.objects, 'bulk_create', side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            counters.reconcile()
+        self.assertEqual(UserStats.objects.count(), stats)
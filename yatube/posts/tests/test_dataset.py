@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from posts import dataset
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_creates_requested_records(self):
+        """Генератор создаёт заданное число записей."""
+        counts = dataset.generate(
+            users=20, groups=3, posts=100, comments=200, follows=5, seed=1
+        )
+        self.assertEqual(counts['users'], 20)
+        self.assertEqual(counts['groups'], 3)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), counts['follows'])
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+
+    def test_generate_rebuilds_derived_data(self):
+        """После генерации ленты и счётчики согласованы с данными."""
+        dataset.generate(
+            users=10, groups=2, posts=50, comments=80, follows=3, seed=2
+        )
+        expected = sum(
+            Post.objects.filter(author=follow.author).count()
+            for follow in Follow.objects.all()
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected)
+        for post in Post.objects.all():
+            self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_generate_is_repeatable(self):
+        """Один seed даёт одинаковое распределение постов по авторам."""
+        def authors():
+            return list(
+                Post.objects.order_by('pk').values_list(
+                    'author__username', flat=True
+                )
+            )
+
+        dataset.generate(users=10, posts=30, comments=0, follows=0, seed=3)
+        first = authors()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        dataset.generate(users=10, posts=30, comments=0, follows=0, seed=3)
+        self.assertEqual(authors(), first)
@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts import jsonl, search, uploads
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.tests.utils import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class JsonLinesTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        with mock.patch.object(uploads, 'schedule'):
+            self.post = Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text='Старый пост про кофе',
+                image=SimpleUploadedFile('small.gif', SMALL_GIF),
+            )
+        self.pub_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.pub_date)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def run_command(self, *args):
+        stderr = io.StringIO()
+        call_command(*args, stderr=stderr)
+        return stderr.getvalue()
+
+    def test_round_trip_preserves_rows_and_references(self):
+        path = os.path.join(self.directory, 'dump.jsonl.gz')
+        media_dir = os.path.join(self.directory, 'media')
+        output = self.run_command(
+            'export_jsonl', path, '--media-dir', media_dir
+        )
+        self.assertIn('posts.post', output)
+        self.assertIn('зап/с', output)
+        image_name = self.post.image.name
+
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, image_name))
+
+        self.run_command(
+            'import_jsonl', path, '--media-dir', media_dir,
+            '--batch-size', '1'
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'group')
+        # Даты auto_now_add берутся из выгрузки
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.image.name, image_name)
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        self.assertEqual(
+            User.objects.get(username='reader').password,
+            self.reader.password
+        )
+        # Производные данные пересчитаны после bulk_create
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user__username='reader', post=post
+            ).exists()
+        )
+        self.assertEqual(
+            [found.pk for found in search.SearchResults('кофе')[0:10]],
+            [post.pk]
+        )
+
+    def test_import_larger_than_sqlite_insert_limit(self):
+        """Больше 500 записей одной модели загружаются пачкой по
+        умолчанию."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(600)
+        )
+        path = os.path.join(self.directory, 'dump.jsonl')
+        self.run_command('export_jsonl', path)
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+        self.run_command('import_jsonl', path)
+        self.assertEqual(Post.objects.count(), 601)
+
+    def test_ignore_conflicts(self):
+        path = os.path.join(self.directory, 'dump.jsonl')
+        self.run_command('export_jsonl', path)
+        self.run_command('import_jsonl', path, '--ignore-conflicts')
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+
+class ExportSnapshotTest(TransactionTestCase):
+    def test_export_reads_one_snapshot(self):
+        """Выгрузка читает все таблицы в одной транзакции, не занимая
+        базу для записи."""
+        User.objects.create_user(username='author')
+        with CaptureQueriesContext(connection) as queries:
+            jsonl.export(io.StringIO())
+        sql = [query['sql'] for query in queries]
+        self.assertEqual(sql[0], 'BEGIN')
+        self.assertEqual(sql.count('BEGIN'), 1)
+        self.assertNotIn('BEGIN IMMEDIATE', sql)
+        self.assertFalse(connection.in_atomic_block)
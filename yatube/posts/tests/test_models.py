@@ -1,6 +1,9 @@
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -57,3 +60,56 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     self.post._meta.get_field(value).help_text, expected)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class IndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')  # type: ignore
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='tests',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_hot_queries_use_indexes(self):
+        """Ленты и комментарии читаются по составным индексам."""
+        queries = {
+            'post_author_pub_date_idx': Post.objects.filter(
+                author=self.author
+            ).order_by('-pub_date', '-pk')[:10],
+            'post_group_pub_date_idx': Post.objects.filter(
+                group=self.group
+            ).order_by('-pub_date', '-pk')[:10],
+            'comment_post_created_idx': Comment.objects.filter(
+                post=self.post
+            ).order_by('-created', '-pk')[:20],
+            # UniqueConstraint в SQLite становится автоиндексом таблицы
+            '(user_id=? AND author_id=?)': Follow.objects.filter(
+                user=self.user, author=self.author
+            ),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                plan = self.query_plan(queryset)
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.author)
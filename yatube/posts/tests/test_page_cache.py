@@ -0,0 +1,119 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import generations
+from posts.models import Comment, Group, Post, User
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_anonymous_hit_served_from_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertIsNotNone(first.context)
+                second = self.client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(first['ETag'], second['ETag'])
+                self.assertIn('Last-Modified', second)
+
+    def test_conditional_get_returns_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                # Для страницы поста нужен только автор поста
+                queries = int(url == self.urls[-1])
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_writes_change_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group
+        )
+        Comment.objects.create(post=self.post, author=self.author, text='к')
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_comment_keeps_list_pages(self):
+        """Комментарий сбрасывает только страницу своего поста."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.author, text='к')
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(
+                    response.status_code,
+                    HTTPStatus.OK if url == self.urls[-1]
+                    else HTTPStatus.NOT_MODIFIED,
+                )
+
+    def test_authenticated_user_bypasses_page_cache(self):
+        self.client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertIsNotNone(response.context)
+                self.assertNotIn('ETag', response)
+
+    def test_fresh_generation_cached_with_timeout(self):
+        """Страница под свежим поколением кэшируется со сроком."""
+        with mock.patch(
+            'posts.generations.timeout', return_value=10
+        ), mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.client.get(self.urls[0])
+        self.assertEqual(cache_set.call_args[0][2], 10)
+
+
+@override_settings(REPLICA_STICKY_SECONDS=10)
+class GenerationTimeoutTest(TestCase):
+    def test_without_replicas_forever(self):
+        """Без реплик записи бессрочные."""
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertIsNone(generations.timeout(time.time_ns()))
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_fresh_generation_expires(self):
+        """Пока реплики могут отставать, запись живёт
+        REPLICA_STICKY_SECONDS."""
+        self.assertEqual(generations.timeout(time.time_ns()), 10)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_old_generation_forever(self):
+        """Поколение старше окна отставания — запись бессрочная."""
+        version = time.time_ns() - 11 * 10 ** 9
+        self.assertIsNone(generations.timeout(version))
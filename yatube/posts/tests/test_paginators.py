@@ -0,0 +1,120 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginators import NEXT, CursorPaginator, encode_cursor
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user1')  # type: ignore
+        # bulk_create даёт постам почти одинаковое время публикации,
+        # порядок между ними определяет id
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Тестовый пост {i}')
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        response = self.client.get(url)
+        ids = [post.id for post in response.context['page_obj']]
+        cursor = response.context['page_obj'].next_cursor
+        while cursor:
+            response = self.client.get(url + f'?cursor={cursor}')
+            page_obj = response.context['page_obj']
+            self.assertTrue(page_obj.is_cursor)
+            ids += [post.id for post in page_obj]
+            cursor = page_obj.next_cursor
+        return ids, response
+
+    def test_cursor_walk_returns_every_post_once(self):
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+        ):
+            with self.subTest(url=url):
+                ids, _ = self.walk(url)
+                self.assertEqual(
+                    ids,
+                    list(
+                        Post.objects.order_by(
+                            '-pub_date', '-pk'
+                        ).values_list('pk', flat=True)
+                    )
+                )
+
+    def test_previous_cursor_returns_previous_page(self):
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url + f'?cursor={first.next_cursor}'
+        ).context['page_obj']
+        back = self.client.get(
+            url + f'?cursor={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        url = reverse('posts:index')
+        _, response = self.walk(url)
+        cursor = response.context['page_obj'].previous_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + f'?cursor={cursor}')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_entry_page_does_not_count(self):
+        """Первая страница ленты без номера в адресе — без COUNT(*)."""
+        for url in (reverse('posts:index'), reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                self.client.force_login(self.author)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertTrue(response.context['page_obj'].is_cursor)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def test_cursor_query_searches_index(self):
+        """Глубокая страница ищет в индексе по дате, а не просматривает
+        его с начала."""
+        posts = Post.objects.order_by('-pub_date', '-pk')
+        cursor = encode_cursor(posts[15], NEXT)
+        with CaptureQueriesContext(connection) as queries:
+            CursorPaginator(Post.objects.all(), 10).page(cursor)
+        with connection.cursor() as db:
+            db.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(row[-1] for row in db.fetchall())
+        self.assertIn('SEARCH', plan)
+        self.assertIn('pub_date<', plan)
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?cursor=@@@')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_forged_cursors_share_cache_key(self):
+        """Ключ кэша страницы зависит от её записей, а не от курсора."""
+        posts = Post.objects.order_by('-pub_date', '-pk')
+        paginator = CursorPaginator(posts, 10)
+        first = paginator.page(None)
+        # Курсор «после» выдуманного поста новее всех даёт те же записи
+        newest = posts.first()
+        newest.pk += 1000
+        forged = paginator.page(encode_cursor(newest, NEXT))
+        self.assertEqual(list(forged), list(first))
+        self.assertEqual(forged.cache_key, first.cache_key)
+        self.assertNotEqual(
+            paginator.page(first.next_cursor).cache_key, first.cache_key
+        )
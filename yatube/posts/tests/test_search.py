@@ -0,0 +1,90 @@
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+from posts.views import POSTS_PER_PAGE
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, text):
+        return Post.objects.create(author=self.author, text=text)
+
+    def found(self, query):
+        return [post.pk for post in search.SearchResults(query)[0:100]]
+
+    def test_index_follows_saves_and_deletes(self):
+        post = self.create_post('Утренний кофе')
+        self.assertEqual(self.found('кофе'), [post.pk])
+        post.text = 'Вечерний чай'
+        post.save()
+        self.assertEqual(self.found('кофе'), [])
+        self.assertEqual(self.found('чай'), [post.pk])
+        post.delete()
+        self.assertEqual(self.found('чай'), [])
+
+    def test_prefix_and_case(self):
+        post = self.create_post('Программирование на Python')
+        self.assertEqual(self.found('программ PYTHON'), [post.pk])
+
+    def test_ranking(self):
+        once = self.create_post('кот и пёс')
+        twice = self.create_post('кот, кот и ещё раз кот')
+        self.assertEqual(self.found('кот'), [twice.pk, once.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_post('AND OR NOT')
+        self.assertEqual(search.SearchResults('"(').count(), 0)
+        self.assertEqual(len(self.found('NOT')), 1)
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        self.create_post('<script>кофе</script> и кофе')
+        post = search.SearchResults('кофе')[0]
+        self.assertNotIn('<script>', post.snippet)
+        self.assertIn('<mark>кофе</mark>', post.snippet)
+
+    def test_rebuild(self):
+        post = self.create_post('Восстановленный индекс')
+        search.remove(post.pk)
+        self.assertEqual(self.found('индекс'), [])
+        search.rebuild()
+        self.assertEqual(self.found('индекс'), [post.pk])
+
+    def test_view_paginates_results(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост номер {i}')
+            for i in range(POSTS_PER_PAGE + 3)
+        )
+        search.rebuild()
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'пост'})
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, POSTS_PER_PAGE + 3
+        )
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D1%81%D1%82&page=2')
+        response = self.client.get(url, {'q': 'пост', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search_uses_index(self):
+        post = self.create_post('Администрирование')
+        self.create_post('Другое')
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, use_distinct = admin.get_search_results(
+            request, Post.objects.all(), 'админ'
+        )
+        self.assertFalse(use_distinct)
+        self.assertIn('posts_post_fts', str(queryset.query))
+        self.assertEqual(list(queryset), [post])
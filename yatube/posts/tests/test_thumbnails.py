@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from posts import thumbnails, uploads
+from posts.models import User
+from posts.tests.utils import SMALL_GIF, create_post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_post_with_image_schedules_thumbnails(self):
+        post, schedule = create_post(
+            self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        schedule.assert_called_once_with(post)
+        _, schedule = create_post(self.author)
+        schedule.assert_not_called()
+
+    def test_text_edit_does_not_regenerate(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        post.text = 'Новый текст'
+        with mock.patch.object(uploads, 'schedule') as schedule:
+            post.save()
+        schedule.assert_not_called()
+
+    def test_pregenerate_stores_every_geometry(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        thumbnails.pregenerate(post.pk)
+        # Шаблону остаётся только прочитать готовые превью
+        with mock.patch.object(
+            ThumbnailBackend, '_create_thumbnail'
+        ) as create:
+            for _, _, geometry, options in thumbnails.variants(post):
+                get_thumbnail(post.image, geometry, **options)
+        create.assert_not_called()
+
+    @override_settings(
+        POST_IMAGE_WIDTHS=(320, 640, 960), POST_IMAGE_FORMATS=('WEBP', 'JPEG')
+    )
+    def test_variants_not_wider_than_original(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        self.assertEqual(len(list(thumbnails.variants(post))), 6)
+        post.image_width = 700
+        self.assertEqual(
+            [
+                (image_format, width)
+                for image_format, width, _, _ in thumbnails.variants(post)
+            ],
+            [('WEBP', 320), ('WEBP', 640), ('JPEG', 320), ('JPEG', 640)]
+        )
+        post.image_width = 100
+        self.assertEqual(len(list(thumbnails.variants(post))), 2)
+
+    def test_prefetch_reads_page_thumbnails_in_one_query(self):
+        posts = [
+            create_post(
+                self.author,
+                image=SimpleUploadedFile(
+                    f'small{i}.gif', SMALL_GIF, 'image/gif'
+                )
+            )[0]
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.pregenerate(post.pk)
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        for post in posts:
+            for image_format, width, geometry, options in (
+                thumbnails.variants(post)
+            ):
+                self.assertIn(
+                    (
+                        width,
+                        get_thumbnail(post.image, geometry, **options).url
+                    ),
+                    [
+                        (variant_width, thumbnail.url)
+                        for variant_width, thumbnail
+                        in post.image_variants[image_format]
+                    ]
+                )
+
+    def test_picture_markup(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        thumbnails.pregenerate(post.pk)
+        html = Template(
+            '{% load post_cards %}{% post_picture post %}'
+        ).render(Context({'post': post}))
+        self.assertIn('<source type="image/webp"', html)
+        for _, width, geometry, options in thumbnails.variants(post):
+            self.assertIn(
+                f'{get_thumbnail(post.image, geometry, **options).url} '
+                f'{width}w',
+                html
+            )
+        self.assertIn('sizes="', html)
+        self.assertEqual(
+            Template('{% load post_cards %}{% post_picture post %}').render(
+                Context({'post': create_post(self.author)[0]})
+            ).strip(),
+            ''
+        )
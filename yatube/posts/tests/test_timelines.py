@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.user = User.objects.create_user(username='user')  # type: ignore
+        cls.old_post = Post.objects.create(author=cls.author, text='старый')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [self.old_post])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        post.delete()
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_feed_pages_through_timeline_index(self):
+        """Лента листается курсором по записям ленты, без COUNT(*) и
+        сортировки вне индекса."""
+        Follow.objects.create(user=self.user, author=self.author)
+        for number in range(15):
+            Post.objects.create(author=self.author, text=f'пост {number}')
+        url = reverse('posts:follow_index')
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(url).context['page_obj']
+        sql = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_timelineentry"' in query['sql']
+        ]
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn('COUNT(', sql[0])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql[0])
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        second = self.client.get(
+            url + f'?cursor={first.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in [*first, *second]],
+            list(Post.objects.order_by(
+                '-pub_date', '-pk'
+            ).values_list('pk', flat=True)),
+        )
+        self.assertIsNone(second.next_cursor)
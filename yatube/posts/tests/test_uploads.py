@@ -0,0 +1,188 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from PIL import Image
+
+from posts import counters, generations, imaging, thumbnails, uploads
+from posts.models import Post, User
+from posts.tests.utils import create_post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+
+
+def make_jpeg(size, orientation=None) -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(
+        buffer, 'JPEG', quality=100, exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+class ProcessImageTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'photo.jpg')
+
+    def test_large_image_bounded_and_exif_stripped(self):
+        with open(self.path, 'wb') as file:
+            file.write(make_jpeg((3000, 1000), orientation=6))
+        metadata = imaging.process_image(self.path, (1000, 1000), 85)
+        with Image.open(self.path) as image:
+            # Поворот из EXIF применён к пикселям, сами метаданные удалены
+            self.assertEqual(image.size, (333, 1000))
+            self.assertEqual(len(image.getexif()), 0)
+        self.assertEqual(metadata, {
+            'image_width': 333,
+            'image_height': 1000,
+            'image_format': 'JPEG',
+            'image_bytes': os.path.getsize(self.path),
+        })
+
+    def test_small_image_keeps_size(self):
+        with open(self.path, 'wb') as file:
+            file.write(make_jpeg((20, 10)))
+        metadata = imaging.process_image(self.path, (1000, 1000), 85)
+        self.assertEqual(
+            (metadata['image_width'], metadata['image_height']), (20, 10)
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=(100, 100))
+class IngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_ingest_records_metadata(self):
+        post, schedule = create_post(
+            self.author,
+            image=SimpleUploadedFile('photo.jpg', make_jpeg((400, 200)))
+        )
+        schedule.assert_called_once_with(post)
+        with mock.patch.object(thumbnails, 'pregenerate') as pregenerate:
+            uploads.ingest(post.pk)
+        pregenerate.assert_called_once_with(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_format),
+            (100, 50, 'JPEG')
+        )
+        self.assertEqual(post.image_bytes, post.image.size)
+
+    def test_ingest_refreshes_caches_and_thumbnails(self):
+        """После обработки карточка, списки и превью строятся заново."""
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('photo.jpg', make_jpeg((400, 200)))
+        )
+        # Страницу с постом открыли до обработки картинки
+        thumbnails.pregenerate(post.pk)
+        files = [
+            thumbnails._thumbnail_file(post.image, geometry, options)
+            for _, _, geometry, options in thumbnails.variants(post)
+        ]
+        self.assertTrue(all(file.exists() for file in files))
+        index = generations.generation(generations.INDEX)
+
+        with mock.patch.object(thumbnails, 'pregenerate'):
+            uploads.ingest(post.pk)
+        self.assertFalse(any(file.exists() for file in files))
+        self.assertGreater(generations.generation(generations.INDEX), index)
+        updated = post.updated
+        post.refresh_from_db()
+        self.assertGreater(post.updated, updated)
+
+    def test_save_keeps_metadata(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('photo.jpg', make_jpeg((40, 20)))
+        )
+        stale = Post.objects.get(pk=post.pk)
+        Post.objects.filter(pk=post.pk).update(
+            image_width=40, image_height=20, image_format='JPEG',
+            image_bytes=100,
+        )
+        stale.text = 'Новый текст'
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_width, 40)
+
+    def test_removing_image_clears_metadata(self):
+        post, _ = create_post(
+            self.author,
+            image=SimpleUploadedFile('photo.jpg', make_jpeg((40, 20)))
+        )
+        Post.objects.filter(pk=post.pk).update(
+            image_width=40, image_height=20, image_format='JPEG',
+            image_bytes=100,
+        )
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_format, '')
+
+
+# Повтор попытки повторяет и её запросы
+@override_settings(
+    WRITE_RETRIES=3, WRITE_RETRY_DELAY=0, DUPLICATE_QUERIES=None
+)
+class RetriedUploadTest(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        self.client.force_login(self.author)
+
+    def test_retry_leaves_no_orphaned_files(self):
+        """Файл откатившейся попытки удаляется, остаётся один — поста."""
+        bump_user = counters.bump_user
+        failures = [OperationalError('database is locked')]
+
+        def flaky_bump_user(*args):
+            # Запись падает уже после сохранения файла
+            if failures:
+                raise failures.pop()
+            bump_user(*args)
+
+        with override_settings(MEDIA_ROOT=self.media), mock.patch.object(
+            counters, 'bump_user', flaky_bump_user
+        ), mock.patch.object(uploads, 'schedule'):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', make_jpeg((40, 20))
+                ),
+            })
+        post = Post.objects.get()
+        self.assertEqual(
+            os.listdir(os.path.join(self.media, 'posts')),
+            [os.path.basename(post.image.name)],
+        )
@@ -209,3 +209,51 @@ class PaginatorViewsTest(TestCase):
             ) + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class ListingQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'user{i}')  # type: ignore
+            for i in range(10)
+        ]
+        for author in cls.authors:
+            Post.objects.create(
+                author=author,
+                text='Тестовый пост',
+                group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing_queries_do_not_depend_on_posts(self):
+        """Автор и группа поста не догружаются отдельными запросами."""
+        urls = {
+            # Курсорная страница: без COUNT(*)
+            reverse('posts:index'): 1,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 2,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                # Первый запрос к группе подсчитывает счётчик её постов
+                self.client.get(url)
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+    def test_for_listing_keeps_card_fields(self):
+        post = Post.objects.for_listing().first()
+        with self.assertNumQueries(0):
+            post.author.username
+            post.author.get_full_name()
+            post.group.slug
+            post.text
+            post.image
@@ -0,0 +1,24 @@
+"""Общие данные и помощники тестов."""
+from unittest import mock
+
+from posts import uploads
+from posts.models import Post
+
+# GIF 2×1 пикселя для загрузки картинок к постам
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def create_post(author, **kwargs):
+    """Пост без фоновой обработки картинки и мок её постановки в очередь."""
+    with mock.patch.object(uploads, 'schedule') as schedule:
+        post = Post.objects.create(
+            author=author, text='Тестовый пост', **kwargs
+        )
+    return post, schedule
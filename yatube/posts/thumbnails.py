@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from core.duplicates import allow_duplicates
+from core.metrics import IMAGE_PROCESSING
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def variants(post):
+    """Варианты картинки поста: (формат, ширина, геометрия, опции).
+
+    Все варианты — кадр с пропорциями POST_IMAGE_SIZE разной ширины.
+    Если ширина оригинала известна, более широкие варианты не нужны:
+    браузер получил бы тот же оригинал, только растянутый.
+    """
+    max_width, max_height = settings.POST_IMAGE_SIZE
+    widths = settings.POST_IMAGE_WIDTHS
+    if post.image_width:
+        widths = [
+            width for width in widths if width <= post.image_width
+        ] or widths[:1]
+    for image_format in settings.POST_IMAGE_FORMATS:
+        for width in widths:
+            height = round(width * max_height / max_width)
+            options = {'crop': 'center', 'upscale': True,
+                       'format': image_format}
+            yield image_format, width, f'{width}x{height}', options
+
+
+def pregenerate(post_id: int) -> None:
+    """Создаёт все варианты картинки поста, чтобы страницы их только читали."""
+    try:
+        post = Post.objects.only('image', 'image_width').filter(
+            pk=post_id
+        ).first()
+        if post is None or not post.image:
+            return
+        started = time.perf_counter()
+        for _, _, geometry, options in variants(post):
+            get_thumbnail(post.image, geometry, **options)
+        IMAGE_PROCESSING.observe(
+            time.perf_counter() - started, stage='thumbnails'
+        )
+    except Exception:
+        logger.exception('Не удалось создать превью поста %s', post_id)
+
+
+def _thumbnail_file(image, geometry: str, options: dict) -> ImageFile:
+    """Файл превью, который создал бы get_thumbnail с теми же опциями."""
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def delete_variants(image) -> None:
+    """Удаляет файлы и записи kvstore всех превью картинки."""
+    # Без известной ширины variants() перечисляет все ширины: превью
+    # могли создать до того, как ширина оригинала стала известна
+    for _, _, geometry, options in variants(Post(image=image)):
+        thumbnail = _thumbnail_file(image, geometry, options)
+        if thumbnail.exists():
+            thumbnail.delete()
+    delete_thumbnails(image, delete_file=False)
+
+
+def _get_thumbnail(post, geometry: str, options: dict):
+    try:
+        # Превью ещё не создано: sorl делает несколько запросов к kvstore
+        # на каждый вариант, но только один раз для картинки
+        with allow_duplicates():
+            return get_thumbnail(post.image, geometry, **options)
+    except Exception:
+        # Как и тег {% thumbnail %}: ошибки видны только в отладке
+        if sorl_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Не удалось получить превью поста %s', post.pk)
+        return None
+
+
+def prefetch(posts) -> None:
+    """Записывает в post.image_variants все варианты картинок страницы.
+
+    image_variants — словарь {формат: [(ширина, файл превью), ...]}.
+    Вместо отдельного обращения к kvstore на каждый вариант ключи
+    читаются одним get_many из кэша и одним запросом к базе для
+    промахов. Отсутствующие превью создаются как обычно.
+    """
+    posts = [post for post in posts if post.image]
+    for post in posts:
+        post.image_variants = {}
+    kv_cache = getattr(default.kvstore, 'cache', None)
+    if kv_cache is None:
+        # Пакетное чтение умеет только cached_db kvstore
+        for post in posts:
+            for image_format, width, geometry, options in variants(post):
+                _add_variant(
+                    post, image_format, width,
+                    _get_thumbnail(post, geometry, options)
+                )
+        return
+
+    entries = [
+        (post, variant, add_prefix(
+            _thumbnail_file(post.image, variant[2], variant[3]).key
+        ))
+        for post in posts
+        for variant in variants(post)
+    ]
+    values = kv_cache.get_many([key for _, _, key in entries])
+    missing = [key for _, _, key in entries if values.get(key) is None]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+
+    for post, (image_format, width, geometry, options), key in entries:
+        value = values.get(key)
+        if value is not None and value is not EMPTY_VALUE:
+            thumbnail = deserialize_image_file(value)
+        else:
+            thumbnail = _get_thumbnail(post, geometry, options)
+        _add_variant(post, image_format, width, thumbnail)
+
+
+def _add_variant(post, image_format: str, width: int, thumbnail) -> None:
+    if thumbnail is not None:
+        post.image_variants.setdefault(image_format, []).append(
+            (width, thumbnail)
+        )
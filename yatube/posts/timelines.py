@@ -0,0 +1,104 @@
+from django.db import connection, transaction
+
+from posts.models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _entries(user_ids, posts):
+    for user_id in user_ids:
+        for post in posts:
+            yield TimelineEntry(
+                user_id=user_id,
+                post_id=post.id,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+
+
+def fan_out(post: Post) -> list:
+    """Раскладывает новый пост по лентам подписчиков и возвращает их id."""
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id  # type: ignore
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        _entries(followers, [post]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return followers
+
+
+def backfill(user_id: int, author_id: int) -> None:
+    """Добавляет в ленту подписчика все посты нового автора."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'id', 'author_id', 'pub_date'
+    )
+    TimelineEntry.objects.bulk_create(
+        _entries([user_id], posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id: int, author_id: int) -> None:
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def entries(user_id: int):
+    """Записи ленты подписчика: страницы берутся диапазоном индекса."""
+    return TimelineEntry.objects.filter(user_id=user_id).only(
+        'post_id', 'pub_date'
+    )
+
+
+def posts_of(page) -> list:
+    """Посты записей страницы ленты одним запросом по id, в её порядке."""
+    posts = Post.objects.for_listing().in_bulk(
+        [entry.post_id for entry in page]
+    )
+    return [
+        posts[entry.post_id] for entry in page if entry.post_id in posts
+    ]
+
+
+def _rebuild_sql(user_filter: str = '') -> str:
+    return (
+        f'INSERT INTO {TimelineEntry._meta.db_table} '
+        '(user_id, post_id, author_id, pub_date) '
+        'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+        f'FROM {Follow._meta.db_table} follow '
+        f'JOIN {Post._meta.db_table} post '
+        'ON post.author_id = follow.author_id' + user_filter
+    )
+
+
+def rebuild(user_ids=None) -> int:
+    """Пересобирает ленты с нуля, возвращает число обработанных подписок.
+
+    Записи лент строятся одним INSERT ... SELECT в базе, без переноса
+    постов в Python — это важно при массовой загрузке данных.
+    """
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    # Читатели видят либо старые ленты, либо новые, но не пустые
+    with transaction.atomic(), connection.cursor() as cursor:
+        entries.delete()
+        if user_ids is None:
+            cursor.execute(_rebuild_sql())
+        for start in range(0, len(user_ids or ()), BATCH_SIZE):
+            chunk = user_ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                _rebuild_sql(f' WHERE follow.user_id IN ({placeholders})'),
+                chunk,
+            )
+
+    return follows.count()
@@ -0,0 +1,122 @@
+"""Фоновая обработка картинок, загруженных к постам.
+
+После фиксации транзакции поток пула превью отдаёт файл в пул
+процессов (декодирование картинки держит GIL), записывает в пост
+размеры, формат и объём результата и создаёт превью уже из
+обработанного оригинала.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.metrics import IMAGE_PROCESSING, THUMBNAIL_QUEUE
+from posts import generations, imaging, thumbnails
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Картинки в очереди и в обработке в этом процессе
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: fork процесса с потоками и открытыми соединениями
+            # небезопасен
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+
+def ingest(post_id: int) -> None:
+    """Обрабатывает оригинал картинки поста и создаёт её превью."""
+    try:
+        post = Post.objects.select_related('author').only(
+            'image', 'group_id', 'author__username'
+        ).filter(pk=post_id).first()
+        if post is None or not post.image:
+            return
+        try:
+            path = post.image.path
+        except NotImplementedError:
+            # Хранилище без локальных файлов: обрабатывать нечего
+            path = None
+        if path is not None:
+            started = time.perf_counter()
+            metadata = get_pool().submit(
+                imaging.process_image,
+                path,
+                settings.IMAGE_MAX_SIZE,
+                settings.IMAGE_QUALITY,
+            ).result()
+            IMAGE_PROCESSING.observe(
+                time.perf_counter() - started, stage='process'
+            )
+            # Картинку могли успеть заменить — тогда её обработает
+            # следующая задача. Новое время изменения меняет ключ
+            # кэша карточки поста
+            updated = Post.objects.filter(
+                pk=post_id, image=post.image.name
+            ).update(updated=timezone.now(), **metadata)
+            if updated:
+                # Превью, созданные до обработки, больше не соответствуют
+                # оригиналу: sorl нашёл бы старые файлы и не пересоздал
+                thumbnails.delete_variants(post.image)
+                generations.invalidate_post(post, post.group_id)
+    except Exception:
+        logger.exception('Не удалось обработать картинку поста %s', post_id)
+    thumbnails.pregenerate(post_id)
+
+
+def _count_pending(delta: int) -> None:
+    global _pending
+    with _pending_lock:
+        _pending += delta
+        THUMBNAIL_QUEUE.set(_pending)
+
+
+def _ingest_in_background(post_id: int) -> None:
+    try:
+        ingest(post_id)
+    finally:
+        _count_pending(-1)
+        # Поток пула открыл собственное соединение с базой
+        connections.close_all()
+
+
+def _submit(post_id: int) -> None:
+    _count_pending(1)
+    thumbnails.get_executor().submit(_ingest_in_background, post_id)
+
+
+def schedule(post: Post) -> None:
+    """Ставит обработку картинки в очередь после фиксации транзакции."""
+    post_id = post.pk
+    transaction.on_commit(lambda: _submit(post_id))
+
+
+def discard(post: Post) -> None:
+    """Удаляет файл картинки, сохранённый откатившейся транзакцией."""
+    image = post.image
+    if image._committed and image.name != (post._old_image or ''):
+        image.storage.delete(image.name)
+
+
+def clear_metadata(post: Post) -> None:
+    Post.objects.filter(pk=post.pk).update(
+        image_width=None, image_height=None, image_format='',
+        image_bytes=None,
+    )
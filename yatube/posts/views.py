@@ -1,90 +1,173 @@
-from django.core.paginator import Paginator, Page
+from typing import Optional
+
+from django.core.paginator import InvalidPage, Paginator, Page
 from django.db.models.query import QuerySet
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, HttpRequest
+from django.http import Http404, HttpResponse, HttpRequest
 from django.shortcuts import (
     get_object_or_404,
     redirect,
     render
 )
 
+from core.writes import write_view
+from posts import generations, timelines
+from posts.search import SearchResults
+from posts.counters import group_posts_count, user_stats
+from posts.decorators import anonymous_page_cache
 from posts.forms import CommentForm, PostForm
 from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import NEXT, CursorPaginator, encode_cursor
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
 
 
-def get_page_obj(posts: QuerySet, request: HttpRequest) -> Page:
-    paginator = Paginator(posts, 10)
+def get_page_obj(
+    posts: QuerySet, request: HttpRequest, count: Optional[int] = None
+) -> Page:
+    posts = posts.order_by('-pub_date', '-pk')
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
+    # Без известного числа постов и номеров страниц в адресе — курсорная
+    # страница, без COUNT(*)
+    if cursor is not None or (count is None and page_number is None):
+        return CursorPaginator(posts, POSTS_PER_PAGE).get_page(cursor)
+
+    paginator = Paginator(posts, POSTS_PER_PAGE)
+    if count is not None:
+        # Известное из счётчика число постов избавляет от COUNT(*)
+        paginator.count = count
     page_obj = paginator.get_page(page_number)
+    # Переход на следующую страницу идёт по курсору, без OFFSET
+    page_obj.next_cursor = (
+        encode_cursor(page_obj[-1], NEXT) if page_obj.has_next() else None
+    )
 
     return page_obj
 
 
+def cache_context(scope: str) -> dict:
+    """Поколение области и срок для {% cache %} фрагментов страницы."""
+    version = generations.generation(scope)
+    return {
+        'cache_version': version,
+        'cache_timeout': generations.timeout(version),
+    }
+
+
+@anonymous_page_cache(lambda: [generations.INDEX])
 def index(request) -> HttpResponse:
     template = 'posts/index.html'
-    page_obj = get_page_obj(Post.objects.all(), request)
+    page_obj = get_page_obj(Post.objects.for_listing(), request)
     context = {
         'page_obj': page_obj,
+        **cache_context(generations.INDEX),
     }
 
     return render(request, template, context)
 
 
+@anonymous_page_cache(lambda slug: [generations.group_scope(slug)])
 def group_list(request, slug):
     group = get_object_or_404(
         Group.objects.select_related(), slug=slug
     )
-    page_obj = get_page_obj(group.posts.all(), request)  # type: ignore
+    page_obj = get_page_obj(
+        Post.objects.for_listing().filter(group=group),
+        request,
+        group_posts_count(group)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        **cache_context(generations.group_scope(group.slug)),
     }
 
     return render(request, 'posts/group_list.html', context)
 
 
+@anonymous_page_cache(lambda username: [generations.author_scope(username)])
 def profile(request, username):
     author = get_object_or_404(
-        User.objects.select_related(), username=username
+        User.objects.select_related('stats'), username=username
+    )
+    stats = user_stats(author)
+    page_obj = get_page_obj(
+        Post.objects.for_listing().filter(author=author),
+        request,
+        stats.posts_count
     )
-    page_obj = get_page_obj(author.posts.all(), request)  # type: ignore
     following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user)  # type: ignore
     )
     context = {
         'author': author,
+        'stats': stats,
         'following': following,
         'page_obj': page_obj,
+        **cache_context(generations.author_scope(author.username)),
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_scopes(post_id):
+    author = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    if author is None:
+        return None
+    # Страница поста показывает и число постов автора
+    return [generations.post_scope(post_id), generations.author_scope(author)]
+
+
+@anonymous_page_cache(post_detail_scopes)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
+        Post.objects.select_related('group', 'author', 'author__stats'),
         id=post_id
     )
     form = CommentForm(request.POST)
-    count = Post.objects.filter(
-        author_id=post.author.id  # type: ignore
-    ).count()
-    comments = Comment.objects.filter(
-        post=post_id
-    ).select_related('author')
+    count = user_stats(post.author).posts_count
     context = {
         'form': form,
         'count': count,
         'text': post.text[0:30],
         'post': post,
-        'comments': comments
+        'comments': get_comments_paginator(post.pk).page(None),
     }
 
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_paginator(post_id) -> CursorPaginator:
+    comments = Comment.objects.filter(post=post_id).select_related(
+        'author'
+    ).only('id', 'text', 'created', 'author__username')
+    return CursorPaginator(comments, COMMENTS_PER_PAGE, date_field='created')
+
+
+@anonymous_page_cache(lambda post_id: [generations.post_scope(post_id)])
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    try:
+        comments = get_comments_paginator(post_id).page(
+            request.GET.get('cursor')
+        )
+    except InvalidPage:
+        raise Http404('Некорректный курсор')
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@write_view(methods=('POST',))
 def post_create(request):
     template = 'posts/create_post.html'
     if request.method == 'POST':
@@ -111,6 +194,7 @@ def post_create(request):
 
 
 @login_required
+@write_view(methods=('POST',))
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
     current_post = get_object_or_404(Post, id=post_id)
@@ -120,7 +204,7 @@ def post_edit(request, post_id):
         instance=current_post
     )
 
-    if current_post.author != request.user:
+    if current_post.author_id != request.user.pk:
         return redirect('post:post_detail', post_id=post_id)
 
     if form.is_valid():
@@ -139,6 +223,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@write_view(methods=('POST',))
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -152,23 +237,43 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    page_obj = get_page_obj(
-        Post.objects.filter(author__following__user=request.user),
-        request
-    )
-    context = {'page_obj': page_obj}
+    # Страница ленты — диапазон индекса записей подписчика, посты к ней
+    # догружаются одним запросом по id
+    page_obj = CursorPaginator(
+        timelines.entries(request.user.pk),
+        POSTS_PER_PAGE,
+        key_field='post_id',
+    ).get_page(request.GET.get('cursor'))
+    page_obj.object_list = timelines.posts_of(page_obj)
+    context = {
+        'page_obj': page_obj,
+        **cache_context(generations.feed_scope(request.user.pk)),
+    }
 
     return render(request, 'posts/follow.html', context)
 
 
+@anonymous_page_cache(lambda: [generations.INDEX])
+def search(request):
+    query = request.GET.get('q', '').strip()
+    # Номера страниц здесь нужны: порядок задаёт релевантность, а не дата
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@write_view()
 def profile_follow(request, username):
-    user = get_object_or_404(User, id=request.user.id)
     author = get_object_or_404(User, username=username)
 
-    if not (user == author):
+    if not (request.user == author):
         Follow.objects.get_or_create(
-            user=user,
+            user=request.user,
             author=author
         )
 
@@ -176,10 +281,12 @@ def profile_follow(request, username):
 
 
 @login_required
+@write_view()
 def profile_unfollow(request, username):
+    # Сигнал удаления подписки читает обоих пользователей
     follow = get_object_or_404(
-        Follow,
-        author=get_object_or_404(User, username=username),
+        Follow.objects.select_related('user', 'author'),
+        author__username=username,
         user=request.user
     )
     follow.delete()
@@ -1,15 +1,19 @@
 # users/views.py
 # Импортируем CreateView, чтобы создать ему наследника
 from django.views.generic import CreateView
+from django.utils.decorators import method_decorator
 # Функция reverse_lazy позволяет получить URL по параметрам функции path()
 # Берём, тоже пригодится
 from django.urls import reverse_lazy
 
+from core.writes import write_view
 
 # Импортируем класс формы, чтобы сослаться на неё во view-классе
 from .forms import CreationForm
 
 
+# Регистрация создаёт пользователя: запись в базу при отправке формы
+@method_decorator(write_view(methods=('POST',)), name='dispatch')
 class SignUp(CreateView):
     form_class = CreationForm
     # После успешной регистрации перенаправляем пользователя на главную.
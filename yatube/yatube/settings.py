@@ -1,7 +1,21 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Файлы, которые сайт пишет во время работы: кэш, метрики, журнал
+# замеров. Тесты (manage.py test и pytest) пишут их во временный каталог
+# и не трогают файлы сайта
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    RUNTIME_DIR = tempfile.mkdtemp(prefix='yatube-tests-')
+    atexit.register(shutil.rmtree, RUNTIME_DIR, ignore_errors=True)
+else:
+    RUNTIME_DIR = BASE_DIR
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 SECRET_KEY = '^=pq5lpk1pwnhinw(t2^dy8m%q8p61a2b(8^zi0@%_&&9mfd%g'
@@ -10,6 +24,22 @@ DEBUG = True
 
 THUMBNAIL_DEBUG = True
 
+# Варианты картинок постов для srcset: кадр с пропорциями
+# POST_IMAGE_SIZE нескольких ширин в каждом формате. Последний формат —
+# запасной для браузеров, не понимающих остальные. Варианты создаются в
+# фоне сразу после загрузки картинки
+POST_IMAGE_SIZE = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+POST_IMAGE_SIZES = '(min-width: 992px) 960px, 100vw'
+THUMBNAIL_WORKERS = 2
+
+# Загруженные оригиналы уменьшаются до этих размеров и пересжимаются в
+# отдельных процессах
+IMAGE_MAX_SIZE = (2048, 2048)
+IMAGE_QUALITY = 85
+IMAGE_WORKERS = 2
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -23,6 +53,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -34,6 +65,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер охватил все остальные слои
+    'core.performance.PerformanceMiddleware',
+    'core.duplicates.DuplicateQueriesMiddleware',
+    'core.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,7 +83,8 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки
+        'BACKEND': 'core.performance.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,13 +101,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Рабочий профиль SQLite под нагрузку включает YATUBE_SQLITE_PROFILE=
+# production. Разработка и тесты идут с настройками Django по умолчанию
+SQLITE_PRODUCTION = os.environ.get('YATUBE_SQLITE_PROFILE') == 'production'
+
+# Прагмы рабочего профиля, по порядку (core.sqlite)
+SQLITE_PRODUCTION_PRAGMAS = {
+    # Читатели не ждут писателя и наоборот
+    'journal_mode': 'WAL',
+    # В режиме WAL база не портится и так, fsync только на контрольных
+    # точках
+    'synchronous': 'NORMAL',
+    # Ждать занятую базу до 5 секунд, а не падать сразу
+    'busy_timeout': 5000,
+    # Кэш страниц 64 МиБ на соединение (в КиБ, поэтому минус)
+    'cache_size': -64000,
+    # Чтение файла через mmap до 256 МиБ
+    'mmap_size': 256 * 1024 * 1024,
+}
+# Прагмы каждого нового соединения SQLite
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+# В рабочем профиле соединение живёт между запросами: не открываем файл
+# и не выполняем прагмы на каждый запрос
+SQLITE_CONN_MAX_AGE = 60 if SQLITE_PRODUCTION else 0
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с BEGIN IMMEDIATE в транзакциях
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': SQLITE_CONN_MAX_AGE,
     }
 }
 
+# Запись из представлений (core.writes): очередь писателей процесса и
+# повтор транзакции при «database is locked» до WRITE_RETRIES раз со
+# случайной паузой до WRITE_RETRY_DELAY * 2^попытка секунд
+WRITE_COORDINATION = True
+WRITE_RETRIES = 5
+WRITE_RETRY_DELAY = 0.05
+
+# Реплики только для чтения: пути к копиям базы через запятую в
+# YATUBE_DB_REPLICAS. Записи и чтения сразу после них идут в default
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': SQLITE_CONN_MAX_AGE,
+        # В тестах реплика — та же тестовая база
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после записи сессия читает только из default
+REPLICA_STICKY_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,14 +201,65 @@ LOGIN_REDIRECT_URL = 'posts:index'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех процессов сервера кэш в файле SQLite
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(RUNTIME_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Замеры запросов: заголовок Server-Timing и журнал в performance.log.
+# В журнал попадает доля запросов PERFORMANCE_SAMPLE_RATE и все запросы
+# медленнее PERFORMANCE_SLOW_MS миллисекунд
+PERFORMANCE_SERVER_TIMING = True
+PERFORMANCE_SAMPLE_RATE = 0.01
+PERFORMANCE_SLOW_MS = 500
+
+# Метрики для Prometheus: процессы копят их в памяти и раз в
+# METRICS_FLUSH_INTERVAL секунд складывают в общий файл SQLite
+METRICS_DB = os.path.join(RUNTIME_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+# Датчики процесса, не обновлявшиеся столько секунд, не учитываются
+METRICS_GAUGE_TTL = 300
+# Кому видна страница /metrics. С токеном — только запросам с заголовком
+# «Authorization: Bearer <токен>» (bearer_token в Prometheus). Без токена
+# — адресам METRICS_ALLOWED_IPS. За обратным прокси на том же хосте все
+# клиенты приходят с 127.0.0.1, поэтому там токен обязателен
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Поиск N+1 и повторов SQL за запрос: 'warn' пишет в журнал, 'raise'
+# бросает исключение (так работают тесты), None выключает поиск
+DUPLICATE_QUERIES = 'warn' if DEBUG else None
+DUPLICATE_QUERIES_THRESHOLD = 3
+
+TEST_RUNNER = 'core.test_runner.DiscoverRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'performance': {
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(RUNTIME_DIR, 'performance.log'),
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['performance'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]